@@ -0,0 +1,100 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+from pathlib import Path
+import resource
+import tempfile
+import time
+
+from instrumentation import KernelInstrumentation
+from simulator import Simulator, VALID_SCHEDULING_ALGORITHMS
+from workload_generator import WorkloadConfig, write_workload
+
+DEFAULT_LADDER = [10, 100, 1000, 10000, 100000]
+ALGORITHMS = ["FCFS", "Priority", "RR", "Multilevel"]
+
+# Loads and runs a workload once. Meant to run in a fresh worker process that did not generate the workload,
+# so peak RSS only covers loading and running it.
+# The timed run is not instrumented, the per-syscall costs come from a second, instrumented run.
+def run_cell(workload_path: Path, config: WorkloadConfig, tickless: bool = False) -> dict:
+    start = time.perf_counter()
+    simulator = Simulator(workload_path, None, False, tickless=tickless)
+    load_time = time.perf_counter() - start
+
+    error = None
+    start = time.perf_counter()
+    try:
+        simulator.run_simulator()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    run_time = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    elapsed_time = simulator.elapsed_time
+    del simulator
+
+    instrumented = Simulator(workload_path, None, False, tickless=tickless)
+    instrumentation = KernelInstrumentation(instrumented)
+    try:
+        instrumented.run_simulator()
+    except Exception:
+        pass
+
+    return {
+        "algorithm": config.scheduling_algorithm,
+        "processes": config.num_processes,
+        "simulated_us": elapsed_time,
+        "load_s": load_time,
+        "run_s": run_time,
+        "simulated_us_per_wall_s": elapsed_time / run_time if run_time > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb,
+        "syscalls": instrumentation.report(),
+        "error": error,
+    }
+
+# Runs every algorithm over every rung of the ladder. Each workload is generated in one worker process and run in another.
+def run_benchmark(algorithms: list[str], ladder: list[int], base_config: WorkloadConfig, tickless: bool = False) -> list[dict]:
+    rows = []
+    for algorithm in algorithms:
+        for num_processes in ladder:
+            config = WorkloadConfig(**{**base_config.__dict__, "scheduling_algorithm": algorithm, "num_processes": num_processes})
+            with tempfile.TemporaryDirectory() as directory:
+                workload_path = Path(directory) / "workload.json"
+                with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+                    executor.submit(write_workload, workload_path, config).result()
+                with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+                    row = executor.submit(run_cell, workload_path, config, tickless).result()
+            print_row(row)
+            rows.append(row)
+    return rows
+
+def print_header():
+    print(f"{'Algorithm':<11} {'Processes':>9} {'Simulated us':>13} {'Load s':>8} {'Run s':>8} {'Sim us/s':>12} {'Peak RSS MB':>11}  Slowest syscall")
+
+def print_row(row: dict):
+    slowest = ""
+    if len(row["syscalls"]) > 0:
+        name, stats = max(row["syscalls"].items(), key=lambda item: item[1]["mean_us"])
+        slowest = f"{name} {stats['mean_us']:.2f}us (p99 {stats['p99_us']:.2f}us)"
+    if row["error"] is not None:
+        slowest = row["error"]
+    print(f"{row['algorithm']:<11} {row['processes']:>9} {row['simulated_us']:>13} {row['load_s']:>8.3f} {row['run_s']:>8.3f} "
+          f"{row['simulated_us_per_wall_s']:>12.0f} {row['peak_rss_mb']:>11.1f}  {slowest}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulator and kernel over a ladder of synthetic workloads.")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(VALID_SCHEDULING_ALGORITHMS), default=ALGORITHMS)
+    parser.add_argument("--ladder", nargs="+", type=int, default=DEFAULT_LADDER)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mean-cpu-time", type=int, default=WorkloadConfig.mean_cpu_time)
+    parser.add_argument("--contention", type=float, default=WorkloadConfig.contention)
+    parser.add_argument("--tickless", action="store_true", help="only deliver the timer interrupts the kernel asks for")
+    parser.add_argument("--json", type=Path, help="also write every row, including per-syscall costs, to this file")
+    args = parser.parse_args()
+
+    base_config = WorkloadConfig(seed=args.seed, mean_cpu_time=args.mean_cpu_time, contention=args.contention)
+    print_header()
+    rows = run_benchmark(args.algorithms, args.ladder, base_config, args.tickless)
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(rows, file, indent=4)
@@ -0,0 +1,121 @@
+from array import array
+import mmap
+from pathlib import Path
+import struct
+from typing import Callable
+
+# Precompiled workload format.
+# A fixed header followed by columns of native-endian int64 values, so every column can be used straight out of a
+# memory-mapped file through a memoryview without copying or parsing anything:
+#   semaphore ids, semaphore initial values, mutex ids,
+#   process arrival, total cpu time, priority, process type, memory needed (bytes), first event (num_processes + 1 entries),
+#   event arrival, event kind, event value.
+# Processes are stored in the order they arrive and each process's events in the order they are dispatched.
+MAGIC: bytes = b"SIMW"
+VERSION: int = 1
+HEADER = struct.Struct("<4sIqqqqqq")
+
+# Scheduling algorithms and process types are stored as indexes into these lists.
+SCHEDULING_ALGORITHMS = ["FCFS", "Priority", "RR", "Multilevel"]
+PROCESS_TYPES = ["Foreground", "Background"]
+
+INT64_MIN: int = -(1 << 63)
+INT64_MAX: int = (1 << 63) - 1
+
+def is_compiled_workload(path: Path) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+# processes are (arrival, total_cpu_time, priority, process_type, memory_needed, [(event arrival, kind, value)]) in arrival order.
+# Every value must be in INT64_MIN..INT64_MAX; compile_workload checks that first.
+def write_compiled_workload(path: Path, scheduling_algorithm: str, memory_size: int, semaphores: list[tuple[int, int]], \
+                            mutexes: list[int], processes: list[tuple]):
+    columns = [array('q') for _ in range(12)]
+    (semaphore_ids, semaphore_init_vals, mutex_ids, arrivals, total_cpu_times, priorities, process_types, memory_needed, \
+     first_events, event_arrivals, event_kinds, event_values) = columns
+
+    for (id, init_val) in semaphores:
+        semaphore_ids.append(id)
+        semaphore_init_vals.append(init_val)
+    mutex_ids.extend(mutexes)
+
+    for (arrival, total_cpu_time, priority, process_type, memory, events) in processes:
+        arrivals.append(arrival)
+        total_cpu_times.append(total_cpu_time)
+        priorities.append(priority)
+        process_types.append(PROCESS_TYPES.index(process_type))
+        memory_needed.append(memory)
+        first_events.append(len(event_arrivals))
+        for (event_arrival, kind, value) in events:
+            event_arrivals.append(event_arrival)
+            event_kinds.append(kind)
+            event_values.append(value)
+    first_events.append(len(event_arrivals))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, SCHEDULING_ALGORITHMS.index(scheduling_algorithm), memory_size, \
+                               len(semaphore_ids), len(mutex_ids), len(arrivals), len(event_arrivals)))
+        for column in columns:
+            column.tofile(file)
+
+# A memory-mapped compiled workload. Pickles as its path and is mapped again when unpickled.
+class CompiledWorkload:
+    scheduling_algorithm: str
+    memory_size: int
+    num_processes: int
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, algorithm, self.memory_size, num_semaphores, num_mutexes, self.num_processes, num_events) = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compiled workload")
+        self.scheduling_algorithm = SCHEDULING_ALGORITHMS[algorithm]
+
+        view = memoryview(self.map)
+        offset = HEADER.size
+        columns = []
+        for length in [num_semaphores, num_semaphores, num_mutexes] + [self.num_processes] * 5 + [self.num_processes + 1] + [num_events] * 3:
+            columns.append(view[offset:offset + length * 8].cast('q'))
+            offset += length * 8
+        (self.semaphore_ids, self.semaphore_init_vals, self.mutex_ids, self.arrivals, self.total_cpu_times, self.priorities, \
+         self.process_types, self.memory_needed, self.first_events, self.event_arrivals, self.event_kinds, self.event_values) = columns
+
+    def __reduce__(self):
+        return (CompiledWorkload, (self.path,))
+
+    def semaphores(self) -> list[tuple[int, int]]:
+        return list(zip(self.semaphore_ids, self.semaphore_init_vals))
+
+    def mutexes(self) -> list[int]:
+        return list(self.mutex_ids)
+
+    # Returns (arrival, total_cpu_time, priority, process_type, memory_needed, [(event arrival, kind, value)]) of the i-th process to arrive.
+    def process(self, i: int) -> tuple:
+        start = self.first_events[i]
+        end = self.first_events[i + 1]
+        events = list(zip(self.event_arrivals[start:end], self.event_kinds[start:end], self.event_values[start:end]))
+        return (self.arrivals[i], self.total_cpu_times[i], self.priorities[i], PROCESS_TYPES[self.process_types[i]], \
+                self.memory_needed[i], events)
+
+# Processes waiting to arrive, built from a compiled workload as they arrive.
+class CompiledArrivals:
+    def __init__(self, compiled: CompiledWorkload, build_process: Callable[[CompiledWorkload, int], object]):
+        self.compiled = compiled
+        self.build_process = build_process
+        self.next_process = 0
+
+    def has_next(self) -> bool:
+        return self.next_process < self.compiled.num_processes
+
+    def next_arrival_time(self) -> int | None:
+        if not self.has_next():
+            return None
+        return self.compiled.arrivals[self.next_process]
+
+    def pop(self):
+        process = self.build_process(self.compiled, self.next_process)
+        self.next_process += 1
+        return process
@@ -1,4 +1,11 @@
-from difference import compare_files
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import time
+
+from difference import compare_files, SIMULATIONS_DIRECTORY, CORRECT_OUTPUT_DIRECTORY, OUTPUT_DIRECTORY
+from result_cache import ResultCache, run_cached
+from simulator import Simulator
 
 def multi_level():
     compare_files("Multilevel1")
@@ -34,5 +41,54 @@ def rr():
     simple_rr()
     complex_rr()
 
+# Runs one simulation into output/test_<name>.txt and diffs it against correct_output/<name>.txt.
+# With a cache, a simulation whose workload and relevant source have not changed is not run again.
+# Returns (name, status, wall time in seconds, whether the run came from the cache).
+def run_and_compare(name: str, cache: ResultCache | None = None) -> tuple[str, str, float, bool]:
+    start = time.perf_counter()
+    cached = False
+    try:
+        if cache is not None:
+            result, cached = run_cached(cache, SIMULATIONS_DIRECTORY / f"{name}.json", OUTPUT_DIRECTORY / f"test_{name}.txt")
+            if result["error"] is not None:
+                return (name, f"ERROR ({result['error']['type']})", time.perf_counter() - start, cached)
+        else:
+            simulator = Simulator(SIMULATIONS_DIRECTORY / f"{name}.json", str(OUTPUT_DIRECTORY / f"test_{name}.txt"), True)
+            simulator.run_simulator()
+    except Exception as e:
+        return (name, f"ERROR ({type(e).__name__})", time.perf_counter() - start, cached)
+    status = "PASS" if compare_files(name) else "FAIL"
+    return (name, status, time.perf_counter() - start, cached)
+
+# Every simulation in simulations/ that has an expected output in correct_output/.
+def find_simulations() -> list[str]:
+    return sorted(path.stem for path in SIMULATIONS_DIRECTORY.glob("*.json") if (CORRECT_OUTPUT_DIRECTORY / f"{path.stem}.txt").exists())
+
+# Runs every simulation in parallel across all cores, writes the diffs to diffs/ and prints a pass/fail table.
+def run_all(cache: ResultCache | None = None) -> bool:
+    OUTPUT_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    names = find_simulations()
+    start = time.perf_counter()
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(run_and_compare, names, [cache] * len(names)))
+    total_time = time.perf_counter() - start
+
+    name_width = max([len(name) for name in names] + [len("Simulation")])
+    print(f"{'Simulation':<{name_width}}  {'Result':<16}  Time")
+    for (name, status, wall_time, cached) in results:
+        print(f"{name:<{name_width}}  {status:<16}  {wall_time:.3f}s{' (cached)' if cached else ''}")
+    num_passed = sum(1 for (_, status, _, _) in results if status == "PASS")
+    num_cached = sum(1 for (_, _, _, cached) in results if cached)
+    print(f"{num_passed}/{len(results)} passed in {total_time:.3f}s, {num_cached} from the cache")
+    return num_passed == len(results)
+
 if __name__ == "__main__":
-    multi_level()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run every simulation and diff its log against the expected output.")
+    parser.add_argument("--no-cache", action="store_true", help="run every simulation even if its result is cached")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the result cache first")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache()
+    if args.clear_cache:
+        ResultCache().clear()
+    sys.exit(0 if run_all(cache) else 1)
\ No newline at end of file
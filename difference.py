@@ -1,18 +1,29 @@
 from difflib import unified_diff
 from pathlib import Path
 
-def compare_files(correct_output_filename: str):
-    diff_dir: Path = Path("diffs")
-    diff_dir.mkdir(parents=True, exist_ok=True)
+# Simulations, their expected and actual output and the diffs between them all live next to this file, wherever it is run from.
+ROOT_DIRECTORY = Path(__file__).parent
+SIMULATIONS_DIRECTORY = ROOT_DIRECTORY / "simulations"
+CORRECT_OUTPUT_DIRECTORY = ROOT_DIRECTORY / "correct_output"
+OUTPUT_DIRECTORY = ROOT_DIRECTORY / "output"
+DIFFS_DIRECTORY = ROOT_DIRECTORY / "diffs"
+
+# Writes the diff between the expected output and the simulator's output to diffs/diff_<name>.txt.
+# Returns True if the outputs are identical.
+def compare_files(correct_output_filename: str) -> bool:
+    DIFFS_DIRECTORY.mkdir(parents=True, exist_ok=True)
     student_output_filename: str = f"test_{correct_output_filename}"
-    with open(f"correct_output/{correct_output_filename}.txt", "r") as correct_output:
-        with open(f"output/{student_output_filename}.txt", "r") as student_output:
+    identical = True
+    with open(CORRECT_OUTPUT_DIRECTORY / f"{correct_output_filename}.txt", "r") as correct_output:
+        with open(OUTPUT_DIRECTORY / f"{student_output_filename}.txt", "r") as student_output:
             diff = unified_diff(
                 correct_output.readlines(),
                 student_output.readlines(),
                 fromfile = f"{correct_output_filename}.txt",
                 tofile = f"{student_output_filename}.txt",
             )
-            with open(f"diffs/diff_{correct_output_filename}.txt", "w") as diff_output:
+            with open(DIFFS_DIRECTORY / f"diff_{correct_output_filename}.txt", "w") as diff_output:
                 for line in diff:
-                    diff_output.write(line)
\ No newline at end of file
+                    identical = False
+                    diff_output.write(line)
+    return identical
@@ -0,0 +1,135 @@
+import json
+import math
+from pathlib import Path
+import time
+
+# Kernel entry points called by the simulator.
+KERNEL_ENTRY_POINTS = [
+    "new_process_arrived",
+    "syscall_exit",
+    "syscall_set_priority",
+    "syscall_init_semaphore",
+    "syscall_semaphore_p",
+    "syscall_semaphore_v",
+    "syscall_init_mutex",
+    "syscall_mutex_lock",
+    "syscall_mutex_unlock",
+    "timer_interrupt",
+    "timer_interrupts",
+]
+
+# Streaming quantile estimate with bounded relative error.
+# Values are counted in logarithmic buckets, so memory depends on the range of values rather than how many were added,
+# and two sketches with the same accuracy can be merged by adding their buckets.
+class QuantileSketch:
+    relative_accuracy: float
+    buckets: dict[int, int]
+    num_zeros: int
+    count: int
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = dict()
+        self.num_zeros = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 0:
+            self.num_zeros += 1
+            return
+        bucket = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other: "QuantileSketch"):
+        assert(self.gamma == other.gamma)
+        self.count += other.count
+        self.num_zeros += other.num_zeros
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.num_zeros
+        if rank < seen:
+            return 0.0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                return 2 * self.gamma ** bucket / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+# Call count, time and context switches for one kernel entry point. Times are in nanoseconds.
+class EntryPointStats:
+    count: int
+    total_ns: int
+    context_switches: int
+    latencies: QuantileSketch
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.context_switches = 0
+        self.latencies = QuantileSketch()
+
+    def report(self) -> dict:
+        return {
+            "count": self.count,
+            "total_us": self.total_ns / 1000,
+            "mean_us": self.total_ns / self.count / 1000 if self.count > 0 else 0.0,
+            "p50_us": self.latencies.quantile(0.5) / 1000,
+            "p99_us": self.latencies.quantile(0.99) / 1000,
+            "context_switches": self.context_switches,
+        }
+
+# Opt-in profiling of the kernel calls a simulator makes.
+# Each entry point is replaced on the kernel instance by a timing wrapper, so a simulator that is not instrumented runs the kernel untouched.
+# A call causes a context switch when the pid it returns differs from the process the simulator was running.
+class KernelInstrumentation:
+    stats: dict[str, EntryPointStats]
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.stats = {name: EntryPointStats() for name in KERNEL_ENTRY_POINTS}
+        self.wrap_kernel()
+
+    def wrap_kernel(self):
+        for name in KERNEL_ENTRY_POINTS:
+            self.wrap(name)
+
+    # Puts the kernel's own entry points back, e.g. so the kernel can be pickled. The stats are kept for wrap_kernel.
+    def unwrap_kernel(self):
+        for name in KERNEL_ENTRY_POINTS:
+            delattr(self.simulator.kernel, name)
+
+    def wrap(self, name: str):
+        kernel = self.simulator.kernel
+        method = getattr(kernel, name)
+        stats = self.stats[name]
+        simulator = self.simulator
+        clock = time.perf_counter_ns
+
+        def instrumented(*args):
+            start = clock()
+            result = method(*args)
+            elapsed = clock() - start
+            stats.count += 1
+            stats.total_ns += elapsed
+            stats.latencies.add(elapsed)
+            # Init syscalls return nothing and -1 means a new process was dropped, neither switches
+            if result is not None and result != -1 and result != simulator.current_process:
+                stats.context_switches += 1
+            return result
+
+        setattr(kernel, name, instrumented)
+
+    def report(self) -> dict[str, dict]:
+        return {name: stats.report() for name, stats in self.stats.items() if stats.count > 0}
+
+    def write_report(self, path: Path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=4)
@@ -4,15 +4,47 @@
 
 
 
-from collections import deque
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+import heapq
+import random
+from typing import Iterable, Iterator
 
 # PID is just an integer, but it is used to make it clear when a integer is expected to be a valid PID.
 PID = int
 
+MB_TO_BYTES: int = 1048576
+# The first part of physical memory belongs to the OS and is never given to processes.
+OS_RESERVED_MEMORY: int = 10 * MB_TO_BYTES
+# Every process sees its memory starting at this virtual address.
+VIRTUAL_ADDRESS_BASE: int = 0x20000000
+
+# Translation cache (TLB) configuration. A TLB_SIZE of 0 disables the cache.
+TLB_SIZE: int = 64
+TLB_PAGE_SIZE: int = 4096
+# When cached translations are thrown away:
+# on exit only drops the exiting process's entries (entries are tagged with their pid),
+# on context switch drops everything whenever a different process starts running.
+TLB_FLUSH_ON_EXIT: str = "exit"
+TLB_FLUSH_ON_CONTEXT_SWITCH: str = "context_switch"
+TLB_INVALIDATION: str = TLB_FLUSH_ON_EXIT
+
+# Demand paging. With a replacement policy set, process memory is split into TLB_PAGE_SIZE pages and a page is only given
+# one of the fixed pool of physical frames when it is first touched, evicting another page when no frame is free.
+# None gives every process one contiguous segment instead.
+PAGE_REPLACEMENT_FIFO: str = "fifo"
+PAGE_REPLACEMENT_LRU: str = "lru"
+PAGE_REPLACEMENT_CLOCK: str = "clock"
+VALID_PAGE_REPLACEMENTS = {PAGE_REPLACEMENT_FIFO, PAGE_REPLACEMENT_LRU, PAGE_REPLACEMENT_CLOCK}
+PAGE_REPLACEMENT: str | None = None
+
 BACKGROUND: str = "Background"
 FOREGROUND: str = "Foreground"
 
+# Kinds of resources a process can block on.
+SEMAPHORE: str = "semaphore"
+MUTEX: str = "mutex"
+
 # This class represents the PCB of processes.
 # It is only here for your convinience and can be modified however you see fit.
 class PCB:
@@ -33,19 +65,203 @@ class PCB:
     def __repr__(self):
         return f"({self.pid}, {self.priority})"
 
+# Ready queue for the Priority scheduler.
+# PCBs are kept in a binary heap keyed by (priority, pid) so the lowest priority wins and ties go to the lowest pid.
+class PriorityQueue:
+    heap: list[PCB]
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def append(self, pcb: PCB):
+        self.heap.append(pcb)
+        self.sift_up(len(self.heap) - 1)
+
+    def pop(self) -> PCB:
+        top = self.heap[0]
+        last = self.heap.pop()
+        if len(self.heap) > 0:
+            self.heap[0] = last
+            self.sift_down(0)
+        return top
+
+    # Pushes pcb and pops the new minimum in a single O(log n) step.
+    def push_pop(self, pcb: PCB) -> PCB:
+        if len(self.heap) == 0 or not is_higher_priority(self.heap[0], pcb):
+            return pcb
+        top = self.heap[0]
+        self.heap[0] = pcb
+        self.sift_down(0)
+        return top
+
+    def sift_up(self, i: int):
+        heap = self.heap
+        pcb = heap[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not is_higher_priority(pcb, heap[parent]):
+                break
+            heap[i] = heap[parent]
+            i = parent
+        heap[i] = pcb
+
+    def sift_down(self, i: int):
+        heap = self.heap
+        pcb = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= len(heap):
+                break
+            if child + 1 < len(heap) and is_higher_priority(heap[child + 1], heap[child]):
+                child += 1
+            if not is_higher_priority(heap[child], pcb):
+                break
+            heap[i] = heap[child]
+            i = child
+        heap[i] = pcb
+
+# Ready queue for FCFS scheduling, where the lowest pid (the first to arrive) runs first.
+# Arrivals come in with increasing pids and go on the end of a sorted deque in O(1).
+# Only PCBs re-entering with an older pid (e.g. woken by a semaphore) go into a side heap, so dispatch is O(1) or O(log n) instead of a full scan.
+class FCFSQueue:
+    in_order: deque[PCB]
+    out_of_order: list[tuple[PID, PCB]]
+
+    def __init__(self):
+        self.in_order = deque()
+        self.out_of_order = []
+
+    def __len__(self):
+        return len(self.in_order) + len(self.out_of_order)
+
+    def append(self, pcb: PCB):
+        if len(self.in_order) == 0 or self.in_order[-1].pid < pcb.pid:
+            self.in_order.append(pcb)
+        else:
+            heapq.heappush(self.out_of_order, (pcb.pid, pcb))
+
+    def pop(self) -> PCB:
+        if len(self.out_of_order) == 0:
+            return self.in_order.popleft()
+        if len(self.in_order) == 0 or self.out_of_order[0][0] < self.in_order[0].pid:
+            return heapq.heappop(self.out_of_order)[1]
+        return self.in_order.popleft()
+
+# Processes blocked on a semaphore are woken in the same order the scheduler would run them,
+# so the waiting queue is a PriorityQueue under the Priority scheduler and a FCFSQueue (lowest pid first) otherwise.
+# The counters record how contended the semaphore was over the run.
+# Holders are the processes that got past p() and have not called v() yet, with how many times they did.
 @dataclass
 class Semaphore:
     value: int
-    waiting: deque[PCB]
+    waiting: PriorityQueue | FCFSQueue
+    kind: str = SEMAPHORE
+    id: int = 0
+    holders: dict[PID, int] = field(default_factory=dict)
+    max_waiting: int = 0
+    total_waits: int = 0
+    blocked_ticks: int = 0
+    blocked_since: dict[PID, int] = field(default_factory=dict)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_waiting": self.max_waiting,
+            "total_waits": self.total_waits,
+            "blocked_ticks": self.blocked_ticks,
+        }
 
 class Mutex:
     semaphore: Semaphore
 
-    def __init__(self):
+    def __init__(self, waiting: PriorityQueue | FCFSQueue, id: int = 0):
         # A mutex is essentially a semaphore with a value of 1
-        self.semaphore = Semaphore(1, deque())
+        self.semaphore = Semaphore(1, waiting, MUTEX, id)
+
+# Ready queue for the Priority scheduler with priority aging.
+# Time is split into aging periods of aging_ticks timer ticks, and a waiting PCB's priority is lowered by one at the end of every period it
+# waits through (never below PRIORITY_AGING_MIN). The aging is never written to the PCB: its effective priority is its priority plus
+# the period it was enqueued in, minus the current period. The heap is keyed on the first two, so the order of aging PCBs never
+# changes as periods pass and a tick costs O(1). PCBs that reach PRIORITY_AGING_MIN (or start there) stop aging and move, once
+# per wait, to a second heap keyed on the priority they settled at.
+# A dispatched PCB runs with its own priority again, the boost only counts while it waits.
+class AgingPriorityQueue:
+    aging_ticks: int
+    current_tick: int
+    # (priority + period enqueued in, pid, pcb)
+    aging: list[tuple[int, PID, PCB]]
+    # (effective priority, pid, pcb)
+    settled: list[tuple[int, PID, PCB]]
+
+    def __init__(self, aging_ticks: int):
+        self.aging_ticks = aging_ticks
+        self.current_tick = 0
+        self.aging = []
+        self.settled = []
+
+    def __len__(self):
+        return len(self.aging) + len(self.settled)
+
+    def period(self) -> int:
+        return self.current_tick // self.aging_ticks
+
+    def append(self, pcb: PCB):
+        if pcb.priority <= PRIORITY_AGING_MIN:
+            heapq.heappush(self.settled, (pcb.priority, pcb.pid, pcb))
+        else:
+            heapq.heappush(self.aging, (pcb.priority + self.period(), pcb.pid, pcb))
+
+    # (effective priority, pid) of the PCB that would be popped next.
+    def peek(self) -> tuple[int, PID]:
+        best = None
+        if len(self.aging) > 0:
+            (key, pid, _) = self.aging[0]
+            best = (key - self.period(), pid)
+        if len(self.settled) > 0 and (best is None or self.settled[0][:2] < best):
+            best = self.settled[0][:2]
+        return best
+
+    def pop(self) -> PCB:
+        if len(self.settled) > 0 and (len(self.aging) == 0 or self.settled[0][:2] < (self.aging[0][0] - self.period(), self.aging[0][1])):
+            return heapq.heappop(self.settled)[2]
+        return heapq.heappop(self.aging)[2]
+
+    # Pushes pcb (with its own priority) and pops the new minimum.
+    def push_pop(self, pcb: PCB) -> PCB:
+        if len(self) == 0 or not self.peek() < (pcb.priority, pcb.pid):
+            return pcb
+        top = self.pop()
+        self.append(pcb)
+        return top
+
+    # Called once per timer interrupt. Returns True if any queued PCB was boosted.
+    def tick(self) -> bool:
+        self.current_tick += 1
+        if self.current_tick % self.aging_ticks != 0 or len(self.aging) == 0:
+            return False
+        # The PCBs that just reached the minimum are the lowest keys
+        floor = PRIORITY_AGING_MIN + self.period()
+        while len(self.aging) > 0 and self.aging[0][0] <= floor:
+            (_, pid, pcb) = heapq.heappop(self.aging)
+            heapq.heappush(self.settled, (PRIORITY_AGING_MIN, pid, pcb))
+        return True
+
+    # Number of ticks until the next tick that may boost a PCB, or None if nothing is aging.
+    def ticks_until_due(self) -> int | None:
+        if len(self.aging) == 0:
+            return None
+        return self.aging_ticks - self.current_tick % self.aging_ticks
+
+    # Counts ticks that are known not to boost anything, see ticks_until_due.
+    def skip(self, num_ticks: int):
+        self.current_tick += num_ticks
 
 RR_QUANTUM_TICKS: int = 4
+# Length in timer ticks of a priority aging period, see AgingPriorityQueue. None disables aging.
+PRIORITY_AGING_TICKS: int | None = None
+PRIORITY_AGING_MIN: int = 0
 ACTIVE_QUEUE_NUM_TICKS: int = 20
 
 MULTILEVEL: str = "Multilevel"
@@ -53,45 +269,210 @@ RR: str = "RR"
 FCFS: str = "FCFS"
 PRIORITY: str = "Priority"
 
+# One level of the Multilevel scheduler.
+# Processes are routed to the first level that takes their type and priority when they become ready, and each level
+# schedules its own processes with its policy (RR, FCFS or Priority). Levels take turns in order: a level stays active for
+# time_slice ticks or until it runs out of processes, then the next level with ready processes becomes active.
+@dataclass(frozen=True)
+class SchedulingLevel:
+    policy: str
+    time_slice: int
+    quantum: int = RR_QUANTUM_TICKS
+    process_types: frozenset[str] = frozenset({FOREGROUND, BACKGROUND})
+    min_priority: int | None = None
+    max_priority: int | None = None
+
+    def takes(self, pcb: "PCB") -> bool:
+        return pcb.process_type in self.process_types and \
+            (self.min_priority is None or pcb.priority >= self.min_priority) and \
+            (self.max_priority is None or pcb.priority <= self.max_priority)
+
+# Levels used by the Multilevel scheduler. None is the Foreground RR / Background FCFS pair built from
+# RR_QUANTUM_TICKS and ACTIVE_QUEUE_NUM_TICKS when the kernel starts.
+MULTILEVEL_LEVELS: list[SchedulingLevel] | None = None
+
+def default_multilevel_levels() -> list[SchedulingLevel]:
+    return [
+        SchedulingLevel(RR, ACTIVE_QUEUE_NUM_TICKS, RR_QUANTUM_TICKS, frozenset({FOREGROUND})),
+        SchedulingLevel(FCFS, ACTIVE_QUEUE_NUM_TICKS, process_types=frozenset({BACKGROUND})),
+    ]
+
+# Scheduling state of one cpu in SMP mode.
+# The kernel works on the selected cpu's state through its own attributes (running, ready_queue, ...), so the schedulers
+# above run unchanged on every cpu. The other cpus' states wait here until set_cpu selects them.
+@dataclass
+class CPUState:
+    running: PCB
+    ready_queue: deque[PCB] | PriorityQueue | AgingPriorityQueue | FCFSQueue
+    level_queues: list[deque[PCB] | FCFSQueue | PriorityQueue]
+    priority_aging: AgingPriorityQueue | None
+    active_level: int = 0
+    active_queue_num_ticks: int = 0
+
+    # Number of processes waiting to run on this cpu.
+    def num_queued(self) -> int:
+        return len(self.ready_queue) + sum(len(queue) for queue in self.level_queues)
+
 # This class represents the Kernel of the simulation.
 # The simulator will create an instance of this object and use it to respond to syscalls and interrupts.
 # DO NOT modify the name of this class or remove it.
 class Kernel:
     scheduling_algorithm: str
-    ready_queue: deque[PCB]
+    ready_queue: deque[PCB] | PriorityQueue | AgingPriorityQueue | FCFSQueue
     waiting_queue: deque[PCB]
     running: PCB
     idle_pcb: PCB
     semaphores: dict[int, Semaphore]
     mutexes: dict[int, Mutex]
-    fcfs_ready_queue: deque[PCB]
-    rr_ready_queue: deque[PCB]
-    active_queue: str
+    levels: list[SchedulingLevel]
+    level_queues: list[deque[PCB] | FCFSQueue | PriorityQueue]
+    active_level: int
     active_queue_num_ticks: int
+    # The ready queue itself when it ages priorities
+    priority_aging: AgingPriorityQueue | None
+    num_ticks: int
+    # Wait-for graph: the semaphore or mutex each blocked process waits on, and the other way around the processes blocked on each
+    # (SEMAPHORE or MUTEX, id). Their holders are kept by the semaphores.
+    blocked_on: dict[PID, Semaphore]
+    waiters: dict[tuple[str, int], set[PID]]
+    # The process the last v() or unlock() woke, 0 if it woke none
+    woken: PID
+    num_cpus: int
+    current_cpu: int
+    cpu_states: list[CPUState]
+    steals: int
+    mmu: "MMU"
 
     # Called before the simulation begins.
     # Use this function to initilize any variables you need throughout the simulation.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def __init__(self, scheduling_algorithm: str, logger, mmu: "MMU", memory_size: int):
         self.scheduling_algorithm = scheduling_algorithm
-        self.ready_queue = deque()
+        self.mmu = mmu
+        self.mmu.init_memory(memory_size)
+        self.ready_queue = self.new_cpu_ready_queue()
+        self.priority_aging = aging_queue(self.ready_queue)
         self.waiting_queue = deque()
         self.idle_pcb = PCB(0, 0, "Foreground")
         self.running = self.idle_pcb
         self.semaphores = dict()
         self.mutexes = dict()
         self.logger = logger
-        self.fcfs_ready_queue = deque()
-        self.rr_ready_queue = deque()
-        self.active_queue = FOREGROUND
+        self.levels = MULTILEVEL_LEVELS if MULTILEVEL_LEVELS is not None else default_multilevel_levels()
+        self.level_queues = [new_ready_queue(level.policy) for level in self.levels]
+        self.active_level = 0
         self.active_queue_num_ticks = 0
+        self.num_ticks = 0
+        self.blocked_on = dict()
+        self.waiters = dict()
+        self.woken = 0
+        self.num_cpus = 1
+        self.current_cpu = 0
+        self.cpu_states = []
+        self.steals = 0
+
+    def new_cpu_ready_queue(self) -> deque[PCB] | PriorityQueue | AgingPriorityQueue | FCFSQueue:
+        if self.scheduling_algorithm == PRIORITY and PRIORITY_AGING_TICKS is not None:
+            return AgingPriorityQueue(PRIORITY_AGING_TICKS)
+        return new_ready_queue(self.scheduling_algorithm)
+
+    # Called by the simulator right after the kernel is created when it simulates more than one cpu.
+    # Every cpu has its own running process and ready queues. New and woken processes go to an idle cpu if there is one,
+    # otherwise to the cpu with the fewest queued processes, and a cpu that runs out of processes steals one from the
+    # cpu with the most queued. Semaphores, mutexes and memory are shared by all cpus.
+    def init_cpus(self, num_cpus: int):
+        self.num_cpus = num_cpus
+        self.cpu_states = [CPUState(self.running, self.ready_queue, self.level_queues, self.priority_aging)]
+        for _ in range(1, num_cpus):
+            ready_queue = self.new_cpu_ready_queue()
+            level_queues = [new_ready_queue(level.policy) for level in self.levels]
+            self.cpu_states.append(CPUState(self.idle_pcb, ready_queue, level_queues, aging_queue(ready_queue)))
+
+    # Stores the selected cpu's scheduling state back into cpu_states.
+    def save_cpu(self):
+        state = self.cpu_states[self.current_cpu]
+        state.running = self.running
+        state.active_level = self.active_level
+        state.active_queue_num_ticks = self.active_queue_num_ticks
+
+    # Selects the cpu that the following syscalls and interrupts are for.
+    def set_cpu(self, cpu: int):
+        if cpu == self.current_cpu:
+            return
+        self.save_cpu()
+        state = self.cpu_states[cpu]
+        self.running = state.running
+        self.ready_queue = state.ready_queue
+        self.level_queues = state.level_queues
+        self.priority_aging = state.priority_aging
+        self.active_level = state.active_level
+        self.active_queue_num_ticks = state.active_queue_num_ticks
+        self.current_cpu = cpu
+
+    # PID running on cpu.
+    def running_pid(self, cpu: int) -> PID:
+        if cpu == self.current_cpu:
+            return self.running.pid
+        return self.cpu_states[cpu].running.pid
+
+    # Makes pcb ready on an idle cpu, preferring the selected one, or else on the cpu with the fewest queued processes.
+    # A pcb given to another cpu is scheduled there straight away.
+    def place(self, pcb: PCB):
+        self.save_cpu()
+        states = self.cpu_states
+        idle = [cpu for cpu in range(self.num_cpus) if states[cpu].running is self.idle_pcb]
+        if self.current_cpu in idle:
+            target = self.current_cpu
+        elif len(idle) > 0:
+            target = idle[0]
+        else:
+            target = min(range(self.num_cpus), key=lambda cpu: (states[cpu].num_queued(), cpu != self.current_cpu))
+
+        selected = self.current_cpu
+        self.set_cpu(target)
+        self.make_ready(pcb)
+        if self.scheduling_algorithm == MULTILEVEL and self.running is self.idle_pcb:
+            self.active_queue_num_ticks = 0
+        if target != selected:
+            self.choose_next_process()
+            self.set_cpu(selected)
+
+    # Moves one queued process from the cpu with the most queued processes to the selected cpu.
+    # Returns False if no other cpu has anything queued.
+    def steal(self) -> bool:
+        self.save_cpu()
+        victim = None
+        most_queued = 0
+        for cpu, state in enumerate(self.cpu_states):
+            num_queued = state.num_queued()
+            if cpu != self.current_cpu and num_queued > most_queued:
+                victim = state
+                most_queued = num_queued
+        if victim is None:
+            return False
+
+        # Take from the first level with ready processes, each queue gives up the process it would run last (RR) or next
+        queue = victim.ready_queue
+        if self.scheduling_algorithm == MULTILEVEL:
+            queue = next(queue for queue in victim.level_queues if len(queue) > 0)
+        self.make_ready(queue.pop())
+        self.steals += 1
+        return True
 
     # This function is triggered every time a new process has arrived.
     # new_process is this process's PID.
     # priority is the priority of new_process.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def new_process_arrived(self, new_process: PID, priority: int, process_type: str, memory_needed: int) -> PID:
-        self.ready_queue.append(PCB(new_process, priority, process_type))
+        if not self.mmu.allocate(new_process, memory_needed):
+            return -1
+        pcb = PCB(new_process, priority, process_type)
+        if self.num_cpus > 1:
+            self.place(pcb)
+            self.choose_next_process()
+            return self.running.pid
+
+        self.make_ready(pcb)
         
         # Neither queue was active, so when a process arrives, it is the start of a new queue
         if self.scheduling_algorithm == MULTILEVEL and self.running is self.idle_pcb:
@@ -102,6 +483,7 @@ class Kernel:
     # This function is triggered every time the current process performs an exit syscall.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def syscall_exit(self) -> PID:
+        self.mmu.free(self.running.pid)
         self.running = self.idle_pcb
         self.choose_next_process()
         return self.running.pid
@@ -114,133 +496,213 @@ class Kernel:
         return self.running.pid
 
 
+    def make_ready(self, pcb: PCB):
+        if self.scheduling_algorithm == MULTILEVEL:
+            self.level_queues[self.route(pcb)].append(pcb)
+            return
+        self.ready_queue.append(pcb)
+
     # This is where you can select the next process to run.
     # This function is not directly called by the simulator and is purely for your convinience.
     # It is not required to actually use this function but it is recommended.
     def choose_next_process(self):
+        self.choose_from_ready_queues()
+        # An idle cpu takes work from the others before staying idle
+        if self.num_cpus > 1 and self.running is self.idle_pcb and self.steal():
+            self.choose_from_ready_queues()
+
+    def choose_from_ready_queues(self):
         if self.scheduling_algorithm == FCFS:
             self.fcfs_chose_next_process(self.ready_queue)
         elif self.scheduling_algorithm == PRIORITY:
-            if len(self.ready_queue) == 0:
-                return
-            
-            if self.running is not self.idle_pcb:
-                self.ready_queue.append(self.running)
-
-            next_process = pop_min_priority(self.ready_queue)
-            self.running = next_process
+            self.priority_chose_next_process(self.ready_queue)
         elif self.scheduling_algorithm == RR:
-            self.rr_chose_next_process(self.ready_queue)
+            self.rr_chose_next_process(self.ready_queue, RR_QUANTUM_TICKS)
         elif self.scheduling_algorithm == MULTILEVEL:
-            # Move everything in standard ready queue to proper queues
-            while len(self.ready_queue) > 0:
-                pcb = self.ready_queue.popleft()
-                if pcb.process_type == FOREGROUND:
-                    self.rr_ready_queue.append(pcb)
-                elif pcb.process_type == BACKGROUND:
-                    self.fcfs_ready_queue.append(pcb)
-                else:
-                    print("Unknown process type")
-            
-            if self.active_queue == FOREGROUND:
-                # RR queue
-                self.rr_chose_next_process(self.rr_ready_queue)
-            elif self.active_queue == BACKGROUND:
-                # FCFS queue
-                self.fcfs_chose_next_process(self.fcfs_ready_queue)
+            # Processes were routed to their level when they became ready, so only the active level is looked at
+            self.level_chose_next_process(self.active_level)
                    
-            # If we have nothing to run in the current queue switch the queue
+            # If we have nothing to run in the current level switch the level
             if self.running is self.idle_pcb:
                 self.switch_active_queue()
-                if self.active_queue == FOREGROUND:
-                    # RR queue
-                    self.rr_chose_next_process(self.rr_ready_queue)
-                elif self.active_queue == BACKGROUND:
-                    # FCFS queue
-                    self.fcfs_chose_next_process(self.fcfs_ready_queue)
+                self.level_chose_next_process(self.active_level)
             
         else:
             print("Unknown scheduling algorithm")
 
-    def rr_chose_next_process(self, queue: deque[PCB]):
+    # Index of the first level that takes pcb.
+    def route(self, pcb: PCB) -> int:
+        for i, level in enumerate(self.levels):
+            if level.takes(pcb):
+                return i
+        print("Unknown process type")
+        return len(self.levels) - 1
+
+    def level_chose_next_process(self, i: int):
+        level = self.levels[i]
+        if level.policy == RR:
+            self.rr_chose_next_process(self.level_queues[i], level.quantum)
+        elif level.policy == FCFS:
+            self.fcfs_chose_next_process(self.level_queues[i])
+        elif level.policy == PRIORITY:
+            self.priority_chose_next_process(self.level_queues[i])
+        else:
+            print("Unknown level policy")
+
+    def priority_chose_next_process(self, queue: PriorityQueue | AgingPriorityQueue):
+        if len(queue) == 0:
+            return
+        
+        if self.running is self.idle_pcb:
+            self.running = queue.pop()
+        else:
+            # The running process is not in the heap, so a changed priority only costs this one push.
+            self.running = queue.push_pop(self.running)
+
+    def rr_chose_next_process(self, queue: deque[PCB], quantum: int):
         if self.running is self.idle_pcb:
             if len(queue) == 0:
                 return
         
             self.running = queue.popleft()
-        elif exceeded_quantum(self.running):
+        elif exceeded_quantum(self.running, quantum):
             # Put on end of queue and run next process
             queue.append(self.running)
             self.running = queue.popleft()
 
-    def fcfs_chose_next_process(self, queue: deque[PCB]):
+    def fcfs_chose_next_process(self, queue: FCFSQueue):
         if len(queue) == 0:
             return
         
         if self.running is self.idle_pcb:
             # Lower pid was the first to arrive
-            self.running = pop_min_pid(queue)
+            self.running = queue.pop()
 
+    # Hands the cpu to the next level, in order, that has ready processes.
     def switch_active_queue(self):
-        # Reset the number of ticks with the active queue
+        # Reset the number of ticks with the active level
         self.active_queue_num_ticks = 0
 
-        if self.active_queue == FOREGROUND:
-            # If background has no processes do nothing.
-            if len(self.fcfs_ready_queue) == 0:
-                return
-            
-            if self.running is not self.idle_pcb:
+        num_levels = len(self.levels)
+        next_level = None
+        for offset in range(1, num_levels):
+            i = (self.active_level + offset) % num_levels
+            if len(self.level_queues[i]) > 0:
+                next_level = i
+                break
+        # If no other level has processes do nothing.
+        if next_level is None:
+            return
+
+        if self.running is not self.idle_pcb:
+            level = self.levels[self.active_level]
+            queue = self.level_queues[self.active_level]
+            if level.policy == RR:
                 # If the running process should be switched out, move it to the back before switching
-                if exceeded_quantum(self.running):
-                    self.rr_ready_queue.append(self.running)
-                    self.running = self.idle_pcb
+                if exceeded_quantum(self.running, level.quantum):
+                    queue.append(self.running)
                 # If the running process should not be switched out, make it run first when we switch back
                 else:
-                    self.rr_ready_queue.appendleft(self.running)
-                    self.running = self.idle_pcb
-
-            self.active_queue = BACKGROUND
-        elif self.active_queue == BACKGROUND:
-            # If foreground has no processes do nothing.
-            if len(self.rr_ready_queue) == 0:
-                return
+                    queue.appendleft(self.running)
+            else:
+                # FCFS and Priority queues are ordered, so the preempted process keeps its place
+                queue.append(self.running)
+            self.running = self.idle_pcb
+        self.active_level = next_level
 
-            if self.running is not self.idle_pcb:
-                self.fcfs_ready_queue.appendleft(self.running)
-                self.running = self.idle_pcb
-            self.active_queue = FOREGROUND
-        else:
-            print("Unknown active queue")
+    def new_wait_queue(self) -> PriorityQueue | FCFSQueue:
+        if self.scheduling_algorithm == PRIORITY:
+            return PriorityQueue()
+        return FCFSQueue()
 
     def semaphore_p(self, semaphore: Semaphore):
+        pid = self.running.pid
         if semaphore.value <= 0:
             semaphore.waiting.append(self.running)
+            semaphore.total_waits += 1
+            semaphore.max_waiting = max(semaphore.max_waiting, len(semaphore.waiting))
+            semaphore.blocked_since[pid] = self.num_ticks
+            self.blocked_on[pid] = semaphore
+            self.waiters.setdefault((semaphore.kind, semaphore.id), set()).add(pid)
             self.running = self.idle_pcb
             self.choose_next_process()
         else:
             semaphore.value -= 1
+            semaphore.holders[pid] = semaphore.holders.get(pid, 0) + 1
 
     def semaphore_v(self, semaphore: Semaphore):
+        held = semaphore.holders.get(self.running.pid, 0)
+        if held == 1:
+            del semaphore.holders[self.running.pid]
+        elif held > 1:
+            semaphore.holders[self.running.pid] = held - 1
+
+        self.woken = 0
         if semaphore.value <= 0 and len(semaphore.waiting) > 0:
-            to_be_released = None
+            to_be_released = semaphore.waiting.pop()
+            semaphore.blocked_ticks += self.num_ticks - semaphore.blocked_since.pop(to_be_released.pid)
+            del self.blocked_on[to_be_released.pid]
+            waiters = self.waiters[(semaphore.kind, semaphore.id)]
+            waiters.remove(to_be_released.pid)
+            if len(waiters) == 0:
+                del self.waiters[(semaphore.kind, semaphore.id)]
+            self.woken = to_be_released.pid
+            semaphore.holders[to_be_released.pid] = semaphore.holders.get(to_be_released.pid, 0) + 1
 
-            if self.scheduling_algorithm == PRIORITY:
-                to_be_released = pop_min_priority(semaphore.waiting)
+            if self.num_cpus > 1:
+                to_be_released.num_quantum_ticks = 0
+                self.place(to_be_released)
             else:
-                to_be_released = pop_min_pid(semaphore.waiting)
-
-            self.ready_queue.append(to_be_released)
-            to_be_released.num_quantum_ticks = 0
+                self.make_ready(to_be_released)
+                to_be_released.num_quantum_ticks = 0
             self.choose_next_process()
             # Don't increment value because we freed a process instead
         else: 
             semaphore.value += 1
 
+    # Whether the blocked process pid can never be woken again. Walks back from what it waits on through the blocked processes that
+    # could release it, and stops at the first semaphore or mutex some process that is not blocked will still release.
+    # The kernel only knows who waits on what, not what processes will do next, so the caller says which semaphores and mutexes
+    # (as (SEMAPHORE or MUTEX, id)) processes will still release: releasers are the processes that will still release each one
+    # and are not blocked on it themselves, free_releasers how many of those are not blocked at all.
+    # Each semaphore or mutex is looked at once, and the walk usually stops at the first one.
+    def is_stuck(self, pid: PID, releasers: dict[tuple[str, int], set[PID]], free_releasers: dict[tuple[str, int], int]) -> bool:
+        seen = set()
+        frontier = [pid]
+        while len(frontier) > 0:
+            semaphore = self.blocked_on[frontier.pop()]
+            resource = (semaphore.kind, semaphore.id)
+            if resource in seen:
+                continue
+            seen.add(resource)
+            if free_releasers.get(resource, 0) > 0:
+                return False
+            # Without free releasers every releaser is blocked on something else
+            frontier.extend(releasers.get(resource, ()))
+        return True
+
+    # Every blocked process that can never be woken again, in pid order. releases are what each blocked process would still release
+    # once woken, free_releasers as for is_stuck. Whatever a process that is not blocked can release wakes its waiters, whose own
+    # releases wake theirs in turn; every blocked process left over waits on something only other left over processes could release.
+    # Costs O(blocked processes + their releases), independent of how many processes are running or ready.
+    def find_stuck(self, releases: dict[PID, Iterable[tuple[str, int]]], free_releasers: dict[tuple[str, int], int]) -> list[PID]:
+        stuck = set(self.blocked_on)
+        released = set()
+        frontier = [resource for (resource, count) in free_releasers.items() if count > 0]
+        while len(frontier) > 0:
+            resource = frontier.pop()
+            if resource in released:
+                continue
+            released.add(resource)
+            for pid in self.waiters.get(resource, ()):
+                stuck.discard(pid)
+                frontier.extend(releases.get(pid, ()))
+        return sorted(stuck)
+
     # This method is triggered when the currently running process requests to initilize a new semaphore.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def syscall_init_semaphore(self, semaphore_id: int, initial_value: int):
-        self.semaphores[semaphore_id] = Semaphore(initial_value, deque())
+        self.semaphores[semaphore_id] = Semaphore(initial_value, self.new_wait_queue(), SEMAPHORE, semaphore_id)
     
     # This method is triggered when the currently running process calls p() on an existing semaphore.
     # DO NOT rename or delete this method. DO NOT change its arguments.
@@ -257,7 +719,7 @@ class Kernel:
     # This method is triggered when the currently running process requests to initilize a new mutex.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def syscall_init_mutex(self, mutex_id: int):
-        self.mutexes[mutex_id] = Mutex()
+        self.mutexes[mutex_id] = Mutex(self.new_wait_queue(), mutex_id)
 
     # This method is triggered when the currently running process calls lock() on an existing mutex.
     # DO NOT rename or delete this method. DO NOT change its arguments.
@@ -275,58 +737,529 @@ class Kernel:
     # This function represents the hardware timer intterupt.
     # It is triggered every 10 microseconds and is the only way a kernel can track passing time.
     # Do not use real time to track how much time has passed as time is simulated.
+    # With more than one cpu every cpu gets its own interrupt, cpu 0 first, and only cpu 0's counts as a tick of time.
     def timer_interrupt(self) -> PID:
+        if self.current_cpu == 0:
+            self.num_ticks += 1
         self.running.num_quantum_ticks += 1
         self.active_queue_num_ticks += 1
 
         if self.scheduling_algorithm == RR:
             self.choose_next_process()
+        elif self.scheduling_algorithm == PRIORITY:
+            # An aged process may now outrank the running one
+            if self.priority_aging is not None and self.priority_aging.tick():
+                self.choose_next_process()
         elif self.scheduling_algorithm == MULTILEVEL:
-            if self.active_queue_num_ticks >= ACTIVE_QUEUE_NUM_TICKS:
+            if self.active_queue_num_ticks >= self.levels[self.active_level].time_slice:
                 self.switch_active_queue()
             self.choose_next_process()
         return self.running.pid 
+
+    # Number of timer ticks until the next one that may change what runs, or None if no tick will until another syscall or arrival.
+    # Ticks before it only need counting and can be delivered together through timer_interrupts.
+    def next_timer_wakeup(self) -> int | None:
+        idle = self.running is self.idle_pcb
+        if self.scheduling_algorithm == RR:
+            if idle:
+                return None if len(self.ready_queue) == 0 else 1
+            return max(1, RR_QUANTUM_TICKS - self.running.num_quantum_ticks)
+        elif self.scheduling_algorithm == PRIORITY:
+            if self.priority_aging is None:
+                return None
+            return self.priority_aging.ticks_until_due()
+        elif self.scheduling_algorithm == MULTILEVEL:
+            if idle:
+                # An idle kernel with nothing queued just restarts the active level's time every tick
+                queued = sum(len(queue) for queue in self.level_queues)
+                return None if queued == 0 else 1
+            level = self.levels[self.active_level]
+            wakeup = level.time_slice - self.active_queue_num_ticks
+            if level.policy == RR:
+                wakeup = min(wakeup, level.quantum - self.running.num_quantum_ticks)
+            return max(1, wakeup)
+        return None
+
+    # Delivers num_ticks timer interrupts at once.
+    # Only valid for ticks before the one next_timer_wakeup asks for, so none of them reschedules.
+    def timer_interrupts(self, num_ticks: int) -> PID:
+        self.num_ticks += num_ticks
+        self.running.num_quantum_ticks += num_ticks
+        self.active_queue_num_ticks += num_ticks
+
+        if self.scheduling_algorithm == PRIORITY and self.priority_aging is not None:
+            self.priority_aging.skip(num_ticks)
+        elif self.scheduling_algorithm == MULTILEVEL and self.running is self.idle_pcb:
+            self.active_queue_num_ticks = 0
+        return self.running.pid
     
+    # Contention counters for every semaphore and mutex used so far.
+    # Blocked ticks only count waits that have ended.
+    def contention_stats(self) -> dict[str, dict[str, int]]:
+        stats = dict()
+        for semaphore_id, semaphore in self.semaphores.items():
+            stats[f"semaphore {semaphore_id}"] = semaphore.stats()
+        for mutex_id, mutex in self.mutexes.items():
+            stats[f"mutex {mutex_id}"] = mutex.semaphore.stats()
+        return stats
+
+# Caches page translations keyed by (pid, virtual page) and evicts the least recently used entry when full.
+# Each entry holds the physical address of the page's first byte and how many bytes of the page belong to the process.
+class TranslationCache:
+    size: int
+    entries: OrderedDict[tuple[PID, int], tuple[int, int]]
+    pages_by_pid: dict[PID, set[int]]
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = OrderedDict()
+        self.pages_by_pid = dict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, pid: PID, page: int) -> tuple[int, int] | None:
+        entry = self.entries.get((pid, page))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((pid, page))
+        self.hits += 1
+        return entry
+
+    def insert(self, pid: PID, page: int, physical_page: int, page_limit: int):
+        if self.size <= 0:
+            return
+        if len(self.entries) >= self.size:
+            (evicted_pid, evicted_page), _ = self.entries.popitem(last=False)
+            self.pages_by_pid[evicted_pid].discard(evicted_page)
+            self.evictions += 1
+        self.entries[(pid, page)] = (physical_page, page_limit)
+        self.pages_by_pid.setdefault(pid, set()).add(page)
+
+    def invalidate(self, pid: PID, page: int):
+        if self.entries.pop((pid, page), None) is not None:
+            self.pages_by_pid[pid].discard(page)
+            self.invalidations += 1
+
+    def invalidate_pid(self, pid: PID):
+        pages = self.pages_by_pid.pop(pid, None)
+        if pages is None:
+            return
+        for page in pages:
+            del self.entries[(pid, page)]
+        self.invalidations += len(pages)
+
+    def flush(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.pages_by_pid.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+        }
+
+# Page replacement policies. Each one is told when a frame is loaded, accessed or freed and picks the frame to evict,
+# all in O(1) (amortized for the clock).
+# Evicts the frame that was loaded longest ago.
+class FIFOReplacement:
+    frames: OrderedDict[int, None]
+
+    def __init__(self, num_frames: int):
+        self.frames = OrderedDict()
+
+    def loaded(self, frame: int):
+        self.frames[frame] = None
+
+    def accessed(self, frame: int):
+        pass
+
+    def freed(self, frame: int):
+        del self.frames[frame]
+
+    def victim(self) -> int:
+        return self.frames.popitem(last=False)[0]
+
+# Evicts the frame that was accessed longest ago.
+class LRUReplacement(FIFOReplacement):
+    def accessed(self, frame: int):
+        self.frames.move_to_end(frame)
+
+# Second chance: the hand sweeps over the frames, clearing reference bits, and evicts the first frame not referenced since the last sweep.
+# Only called for a victim when every frame is in use.
+class ClockReplacement:
+    referenced: bytearray
+    hand: int
+
+    def __init__(self, num_frames: int):
+        self.referenced = bytearray(num_frames)
+        self.hand = 0
+
+    def loaded(self, frame: int):
+        self.referenced[frame] = 1
+
+    def accessed(self, frame: int):
+        self.referenced[frame] = 1
+
+    def freed(self, frame: int):
+        self.referenced[frame] = 0
+
+    def victim(self) -> int:
+        while self.referenced[self.hand]:
+            self.referenced[self.hand] = 0
+            self.hand = (self.hand + 1) % len(self.referenced)
+        frame = self.hand
+        self.hand = (self.hand + 1) % len(self.referenced)
+        return frame
+
+REPLACEMENT_POLICIES = {
+    PAGE_REPLACEMENT_FIFO: FIFOReplacement,
+    PAGE_REPLACEMENT_LRU: LRUReplacement,
+    PAGE_REPLACEMENT_CLOCK: ClockReplacement,
+}
+
+# Demand paging over a fixed pool of frames.
+# Each process has a page table with one entry per page of its memory, holding the page's frame or -1 while it is not resident.
+class DemandPager:
+    num_frames: int
+    page_tables: dict[PID, list[int]]
+    limits: dict[PID, int]
+    frame_owners: list[tuple[PID, int] | None]
+    free_frames: list[int]
+    resident: dict[PID, int]
+    peak_resident: dict[PID, int]
+    accesses: int
+    page_faults: int
+    evictions: int
+
+    def __init__(self, memory_size: int, policy: str, tlb: TranslationCache):
+        self.num_frames = max(0, memory_size // TLB_PAGE_SIZE)
+        self.policy = REPLACEMENT_POLICIES[policy](self.num_frames)
+        self.tlb = tlb
+        self.page_tables = dict()
+        self.limits = dict()
+        self.frame_owners = [None] * self.num_frames
+        # Lowest frames are handed out first
+        self.free_frames = list(range(self.num_frames - 1, -1, -1))
+        self.resident = dict()
+        self.peak_resident = dict()
+        self.accesses = 0
+        self.page_faults = 0
+        self.evictions = 0
+
+    # Pages are only backed by frames once touched, so a process of any size is admitted.
+    def allocate(self, pid: PID, size: int):
+        self.page_tables[pid] = [-1] * ((size + TLB_PAGE_SIZE - 1) // TLB_PAGE_SIZE)
+        self.limits[pid] = size
+        self.resident[pid] = 0
+        self.peak_resident[pid] = 0
+
+    def free(self, pid: PID):
+        page_table = self.page_tables.pop(pid, None)
+        if page_table is None:
+            return
+        del self.limits[pid]
+        del self.resident[pid]
+        for frame in page_table:
+            if frame >= 0:
+                self.policy.freed(frame)
+                self.frame_owners[frame] = None
+                self.free_frames.append(frame)
+
+    # Physical address of the given byte of pid's memory, loading its page if needed.
+    # Returns None if the offset is outside pid's memory or there are no frames at all.
+    def translate(self, pid: PID, offset: int) -> int | None:
+        limit = self.limits.get(pid)
+        if limit is None or offset < 0 or offset >= limit:
+            return None
+        page, page_offset = divmod(offset, TLB_PAGE_SIZE)
+        page_table = self.page_tables[pid]
+        self.accesses += 1
+        frame = page_table[page]
+        if frame < 0:
+            frame = self.load(pid, page)
+            if frame is None:
+                return None
+        else:
+            self.policy.accessed(frame)
+        return self.frame_address(frame) + page_offset
+
+    def load(self, pid: PID, page: int) -> int | None:
+        self.page_faults += 1
+        if len(self.free_frames) > 0:
+            frame = self.free_frames.pop()
+        elif self.num_frames > 0:
+            frame = self.policy.victim()
+            self.evict(frame)
+        else:
+            return None
+        self.frame_owners[frame] = (pid, page)
+        self.page_tables[pid][page] = frame
+        self.policy.loaded(frame)
+        self.resident[pid] += 1
+        self.peak_resident[pid] = max(self.peak_resident[pid], self.resident[pid])
+        return frame
+
+    def evict(self, frame: int):
+        owner, page = self.frame_owners[frame]
+        self.page_tables[owner][page] = -1
+        self.resident[owner] -= 1
+        self.tlb.invalidate(owner, page + VIRTUAL_ADDRESS_BASE // TLB_PAGE_SIZE)
+        self.evictions += 1
+
+    def frame_address(self, frame: int) -> int:
+        return OS_RESERVED_MEMORY + frame * TLB_PAGE_SIZE
+
+    # Tells the replacement policy about an access the TLB answered.
+    def accessed_frame_at(self, physical_page: int):
+        self.accesses += 1
+        self.policy.accessed((physical_page - OS_RESERVED_MEMORY) // TLB_PAGE_SIZE)
+
+    def stats(self) -> dict[str, int | float]:
+        resident_sets = list(self.peak_resident.values())
+        return {
+            "frames": self.num_frames,
+            "accesses": self.accesses,
+            "page_faults": self.page_faults,
+            "fault_rate": self.page_faults / self.accesses if self.accesses > 0 else 0.0,
+            "evictions": self.evictions,
+            "max_resident_pages": max(resident_sets, default=0),
+            "mean_resident_pages": sum(resident_sets) / len(resident_sets) if len(resident_sets) > 0 else 0.0,
+        }
+
+# Sorted set of (size, start) free blocks as a skip list, so adding, removing and finding the smallest block that fits are all
+# O(log n) expected instead of shifting a sorted list. Levels come from a fixed seed, they only decide the shape, never the result.
+# Pickled as its sorted keys, the links would otherwise be pickled one recursive call per block.
+class FreeBlockIndex:
+    MAX_LEVEL: int = 32
+    # Each node is [key, next node on level 0, next node on level 1, ...], the head's key is None
+    head: list
+    level: int
+    length: int
+
+    def __init__(self, keys: Iterable[tuple[int, int]] = ()):
+        self.head = [None] + [None] * self.MAX_LEVEL
+        self.level = 1
+        self.length = 0
+        self.random = random.Random(0)
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        node = self.head[1]
+        while node is not None:
+            yield node[0]
+            node = node[1]
+
+    def __reduce__(self):
+        return (FreeBlockIndex, (list(self),))
+
+    # The last node on each level whose key is below key.
+    def predecessors(self, key: tuple[int, int]) -> list[list]:
+        update = [self.head] * self.MAX_LEVEL
+        node = self.head
+        for i in range(self.level, 0, -1):
+            following = node[i]
+            while following is not None and following[0] < key:
+                node = following
+                following = node[i]
+            update[i - 1] = node
+        return update
+
+    def add(self, key: tuple[int, int]):
+        level = 1
+        while level < self.MAX_LEVEL and self.random.random() < 0.5:
+            level += 1
+        self.level = max(self.level, level)
+        update = self.predecessors(key)
+        node = [key] + [None] * level
+        for i in range(1, level + 1):
+            node[i] = update[i - 1][i]
+            update[i - 1][i] = node
+        self.length += 1
+
+    def remove(self, key: tuple[int, int]):
+        update = self.predecessors(key)
+        node = update[0][1]
+        for i in range(1, len(node)):
+            update[i - 1][i] = node[i]
+        self.length -= 1
+
+    # Smallest key that is not below key, or None.
+    def ceiling(self, key: tuple[int, int]) -> tuple[int, int] | None:
+        node = self.predecessors(key)[0][1]
+        return None if node is None else node[0]
+
 # This class represents the MMU of the simulation.
 # The simulator will create an instance of this object and use it to translate memory accesses.
 # DO NOT modify the name of this class or remove it.
 class MMU:
+    segments: dict[PID, "Segment"]
+    tlb: TranslationCache
+    tlb_invalidation: str
+    page_replacement: str | None
+    pager: DemandPager | None
+    free_by_size: FreeBlockIndex
+    free_by_start: dict[int, int]
+    free_by_end: dict[int, int]
+
     # Called before the simulation begins (even before kernel __init__).
     # Use this function to initilize any variables you need throughout the simulation.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def __init__(self, logger):
-        pass
+        self.logger = logger
+        self.segments = dict()
+        # Free blocks are indexed three ways:
+        # (size, start) pairs in a skip list to find the best fit in O(log n),
+        # and start -> size / end -> start maps to find the neighbours of a freed block in O(1).
+        self.free_by_size = FreeBlockIndex()
+        self.free_by_start = dict()
+        self.free_by_end = dict()
+        self.tlb = TranslationCache(TLB_SIZE)
+        self.tlb_invalidation = TLB_INVALIDATION
+        self.page_replacement = PAGE_REPLACEMENT
+        self.pager = None
+
+    # Called by the kernel once the size of physical memory is known.
+    def init_memory(self, memory_size: int):
+        if self.page_replacement is not None:
+            self.pager = DemandPager(memory_size - OS_RESERVED_MEMORY, self.page_replacement, self.tlb)
+        elif memory_size > OS_RESERVED_MEMORY:
+            self.add_free_block(OS_RESERVED_MEMORY, memory_size - OS_RESERVED_MEMORY)
+
+    # Gives pid the smallest free block that fits (lowest address on ties).
+    # Returns False if no free block is big enough. With paging every process fits.
+    def allocate(self, pid: PID, size: int) -> bool:
+        if self.pager is not None:
+            self.pager.allocate(pid, size)
+            return True
+        best_fit = self.free_by_size.ceiling((size, -1))
+        if best_fit is None:
+            return False
+        block_size, start = best_fit
+        self.remove_free_block(start, block_size)
+        if block_size > size:
+            self.add_free_block(start + size, block_size - size)
+        self.segments[pid] = Segment(start, size)
+        return True
+
+    # Returns pid's block to the free list, merging it with any free neighbours.
+    def free(self, pid: PID):
+        self.tlb.invalidate_pid(pid)
+        if self.pager is not None:
+            self.pager.free(pid)
+            return
+        segment = self.segments.pop(pid, None)
+        if segment is None or segment.limit == 0:
+            return
+        start = segment.base
+        size = segment.limit
+
+        if start in self.free_by_end:
+            previous_start = self.free_by_end[start]
+            previous_size = self.free_by_start[previous_start]
+            self.remove_free_block(previous_start, previous_size)
+            start = previous_start
+            size += previous_size
+
+        end = start + size
+        if end in self.free_by_start:
+            next_size = self.free_by_start[end]
+            self.remove_free_block(end, next_size)
+            size += next_size
+
+        self.add_free_block(start, size)
+
+    def add_free_block(self, start: int, size: int):
+        self.free_by_size.add((size, start))
+        self.free_by_start[start] = size
+        self.free_by_end[start + size] = start
+
+    def remove_free_block(self, start: int, size: int):
+        self.free_by_size.remove((size, start))
+        del self.free_by_start[start]
+        del self.free_by_end[start + size]
 
     # Translate the virtual address to its physical address.
     # If it is not a valid address for the given process, return None which will cause a segmentation fault.
     # DO NOT rename or delete this method. DO NOT change its arguments.
     def translate(self, address: int, pid: PID) -> int | None:
-        return None
+        page, page_offset = divmod(address, TLB_PAGE_SIZE)
+        entry = self.tlb.lookup(pid, page)
+        if entry is not None:
+            physical_page, page_limit = entry
+            if page_offset < page_limit:
+                if self.pager is not None:
+                    self.pager.accessed_frame_at(physical_page)
+                return physical_page + page_offset
+            return None
+
+        if self.pager is not None:
+            return self.translate_paged(address, pid, page)
+
+        segment = self.segments.get(pid)
+        if segment is None:
+            return None
+        offset = address - VIRTUAL_ADDRESS_BASE
+        if offset < 0 or offset >= segment.limit:
+            return None
+
+        page_start = offset - page_offset
+        if page_start >= 0:
+            # Only pages that lie entirely past the virtual base are cached
+            self.tlb.insert(pid, page, segment.base + page_start, min(TLB_PAGE_SIZE, segment.limit - page_start))
+        return segment.base + offset
+
+    def translate_paged(self, address: int, pid: PID, page: int) -> int | None:
+        offset = address - VIRTUAL_ADDRESS_BASE
+        physical_address = self.pager.translate(pid, offset)
+        if physical_address is not None:
+            page_start = offset - offset % TLB_PAGE_SIZE
+            self.tlb.insert(pid, page, physical_address - offset % TLB_PAGE_SIZE, min(TLB_PAGE_SIZE, self.pager.limits[pid] - page_start))
+        return physical_address
+
+    # Called whenever a different process starts running.
+    def switch_address_space(self, pid: PID):
+        if self.tlb_invalidation == TLB_FLUSH_ON_CONTEXT_SWITCH:
+            self.tlb.flush()
+
+# A process's contiguous block of physical memory.
+@dataclass
+class Segment:
+    base: int
+    limit: int
+
+def aging_queue(queue: deque[PCB] | PriorityQueue | AgingPriorityQueue | FCFSQueue) -> AgingPriorityQueue | None:
+    return queue if isinstance(queue, AgingPriorityQueue) else None
+
+def new_ready_queue(policy: str) -> deque[PCB] | FCFSQueue | PriorityQueue:
+    if policy == PRIORITY:
+        return PriorityQueue()
+    elif policy == FCFS:
+        return FCFSQueue()
+    return deque()
 
-def exceeded_quantum(pcb: PCB) -> bool:
-    if pcb.num_quantum_ticks >= RR_QUANTUM_TICKS:
+def exceeded_quantum(pcb: PCB, quantum: int) -> bool:
+    if pcb.num_quantum_ticks >= quantum:
         pcb.num_quantum_ticks = 0
         return True
     else:
         return False
     
-def pop_min_priority(pcbs: list[PCB]) -> PCB:
-    min_index = 0
-    for i in range(1, len(pcbs)):
-        process = pcbs[i]
-        if process.priority < pcbs[min_index].priority:
-            min_index = i
-        elif process.priority == pcbs[min_index].priority and process.pid < pcbs[min_index].pid:
-            min_index = i
-    popped = pcbs[min_index]
-    del pcbs[min_index]
-    return popped
-
-def pop_min_pid(pcbs: list[PCB]):
-    lowest_pid_i = 0
-    for i in range(1, len(pcbs)):
-        if pcbs[i].pid < pcbs[lowest_pid_i].pid:
-            lowest_pid_i = i
-    popped = pcbs[lowest_pid_i]
-    del pcbs[lowest_pid_i]
-    return popped
\ No newline at end of file
+def is_higher_priority(a: PCB, b: PCB) -> bool:
+    return a.priority < b.priority or (a.priority == b.priority and a.pid < b.pid)
@@ -0,0 +1,208 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import json
+from pathlib import Path
+
+from instrumentation import QuantileSketch
+from simulation_log import PROCESS_ARRIVED, PROCESS_DROPPED, CONTEXT_SWITCH, PROCESS_FINISHED, TRAPPED
+from simulator import Simulator, VALID_SCHEDULING_ALGORITHMS
+
+MICRO_S = int
+PID = int
+
+ALGORITHMS = ["FCFS", "Priority", "RR", "Multilevel"]
+
+# Count, mean, max and quantiles of a stream of values, without keeping the values.
+# Summaries of separate runs can be merged.
+class StreamingSummary:
+    count: int
+    total: float
+    max: float
+    sketch: QuantileSketch
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "StreamingSummary"):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def report(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.0,
+            "p50": self.sketch.quantile(0.5),
+            "p90": self.sketch.quantile(0.9),
+            "p99": self.sketch.quantile(0.99),
+            "max": self.max,
+        }
+
+# Scheduling metrics of one or more runs. Times are in microseconds.
+# Turnaround is arrival to exit, response is arrival to first being dispatched and waiting is turnaround minus time on the cpu.
+# Processes that trap count the same as processes that finish.
+class SchedulingMetrics:
+    turnaround: StreamingSummary
+    waiting: StreamingSummary
+    response: StreamingSummary
+    context_switches: int
+    busy_time: MICRO_S
+    elapsed_time: MICRO_S
+    finished: int
+    trapped: int
+    dropped: int
+
+    def __init__(self):
+        self.turnaround = StreamingSummary()
+        self.waiting = StreamingSummary()
+        self.response = StreamingSummary()
+        self.context_switches = 0
+        self.busy_time = 0
+        self.elapsed_time = 0
+        self.finished = 0
+        self.trapped = 0
+        self.dropped = 0
+
+    def merge(self, other: "SchedulingMetrics"):
+        self.turnaround.merge(other.turnaround)
+        self.waiting.merge(other.waiting)
+        self.response.merge(other.response)
+        self.context_switches += other.context_switches
+        self.busy_time += other.busy_time
+        self.elapsed_time += other.elapsed_time
+        self.finished += other.finished
+        self.trapped += other.trapped
+        self.dropped += other.dropped
+
+    def report(self) -> dict:
+        return {
+            "turnaround_us": self.turnaround.report(),
+            "waiting_us": self.waiting.report(),
+            "response_us": self.response.report(),
+            "cpu_utilization": self.busy_time / self.elapsed_time if self.elapsed_time > 0 else 0.0,
+            "context_switches": self.context_switches,
+            "finished": self.finished,
+            "trapped": self.trapped,
+            "dropped": self.dropped,
+        }
+
+# What is remembered about a process until it exits.
+@dataclass(slots=True)
+class LiveProcess:
+    arrival: MICRO_S
+    first_dispatch: MICRO_S | None = None
+    cpu_time: MICRO_S = 0
+
+# Computes SchedulingMetrics while a simulation runs, from the arrivals, context switches and exits it emits.
+# A process runs from the tick after it is switched to up to the tick it is switched away or exits,
+# so its time on the cpu is the sum of the time between those events.
+# With more than one cpu, what runs is tracked per cpu and utilization is out of the time of all cpus.
+class MetricsCollector:
+    metrics: SchedulingMetrics
+    live: dict[PID, LiveProcess]
+    running: list[PID]
+    running_since: list[MICRO_S]
+    last_arrival: PID
+
+    def __init__(self, simulator: Simulator):
+        self.simulator = simulator
+        self.metrics = SchedulingMetrics()
+        self.live = dict()
+        self.running = [0] * simulator.num_cpus
+        self.running_since = [0] * simulator.num_cpus
+        self.last_arrival = 0
+        simulator.subscribe(self.on_event, [PROCESS_ARRIVED, PROCESS_DROPPED, CONTEXT_SWITCH, PROCESS_FINISHED, TRAPPED])
+
+    def on_event(self, time: MICRO_S, kind: int, args: tuple):
+        cpu = self.simulator.current_cpu
+        if kind == CONTEXT_SWITCH:
+            self.stop_running(time, cpu)
+            self.metrics.context_switches += 1
+            self.running[cpu] = args[0]
+            self.running_since[cpu] = time
+            process = self.live.get(args[0])
+            if process is not None and process.first_dispatch is None:
+                process.first_dispatch = time
+        elif kind == PROCESS_ARRIVED:
+            self.last_arrival = args[1]
+            self.live[self.last_arrival] = LiveProcess(time)
+        elif kind == PROCESS_DROPPED:
+            del self.live[self.last_arrival]
+            self.metrics.dropped += 1
+        else:
+            self.stop_running(time, cpu)
+            process = self.live.pop(args[0])
+            turnaround = time - process.arrival
+            self.metrics.turnaround.add(turnaround)
+            self.metrics.waiting.add(turnaround - process.cpu_time)
+            # A process is always dispatched before it can exit
+            self.metrics.response.add(process.first_dispatch - process.arrival)
+            if kind == TRAPPED:
+                self.metrics.trapped += 1
+            else:
+                self.metrics.finished += 1
+            self.running[cpu] = 0
+
+    def stop_running(self, time: MICRO_S, cpu: int):
+        process = self.live.get(self.running[cpu])
+        if process is not None:
+            process.cpu_time += time - self.running_since[cpu]
+            self.metrics.busy_time += time - self.running_since[cpu]
+
+    def summary(self) -> SchedulingMetrics:
+        self.metrics.elapsed_time = self.simulator.elapsed_time * self.simulator.num_cpus
+        return self.metrics
+
+# Runs a workload once and returns its metrics. Meant to run in a worker process.
+def measure(workload_path: Path, scheduling_algorithm: str | None = None) -> SchedulingMetrics:
+    simulator = Simulator(workload_path, None, False, scheduling_algorithm=scheduling_algorithm)
+    collector = MetricsCollector(simulator)
+    simulator.run_simulator()
+    return collector.summary()
+
+# Runs the same workload under each algorithm in parallel. Failed runs report their error instead.
+def compare_algorithms(workload_path: Path, algorithms: list[str]) -> dict[str, dict]:
+    with ProcessPoolExecutor() as executor:
+        futures = {algorithm: executor.submit(measure, workload_path, algorithm) for algorithm in algorithms}
+    comparison = dict()
+    for algorithm, future in futures.items():
+        try:
+            comparison[algorithm] = future.result().report()
+        except Exception as e:
+            comparison[algorithm] = {"error": f"{type(e).__name__}: {e}"}
+    return comparison
+
+def print_comparison(comparison: dict[str, dict]):
+    print(f"{'Algorithm':<11} {'Processes':>9} {'Turnaround':>11} {'p99':>9} {'Waiting':>9} {'Response':>9} {'p99':>9} {'CPU util':>8} {'Switches':>9}")
+    for algorithm, report in comparison.items():
+        if "error" in report:
+            print(f"{algorithm:<11} {report['error']}")
+            continue
+        turnaround = report["turnaround_us"]
+        response = report["response_us"]
+        print(f"{algorithm:<11} {turnaround['count']:>9} {turnaround['mean']:>11.1f} {turnaround['p99']:>9.1f} {report['waiting_us']['mean']:>9.1f} "
+              f"{response['mean']:>9.1f} {response['p99']:>9.1f} {report['cpu_utilization']:>8.3f} {report['context_switches']:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scheduling metrics of a workload under several scheduling algorithms.")
+    parser.add_argument("workload", type=Path)
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(VALID_SCHEDULING_ALGORITHMS), default=ALGORITHMS)
+    parser.add_argument("--json", type=Path, help="also write the full comparison to this file")
+    args = parser.parse_args()
+
+    comparison = compare_algorithms(args.workload, args.algorithms)
+    print_comparison(comparison)
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(comparison, file, indent=4)
@@ -0,0 +1,161 @@
+import argparse
+import ast
+from functools import cache
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+from metrics import MetricsCollector
+from simulator import Simulator
+
+SOURCE_DIRECTORY = Path(__file__).parent
+DEFAULT_CACHE_DIRECTORY = SOURCE_DIRECTORY / ".result_cache"
+DEFAULT_MAX_SIZE: int = 1 << 30
+
+LOG_FILE: str = "log"
+RESULT_FILE: str = "result.json"
+
+# Everything that decides what a run writes. kernel.py is keyed by its syntax tree, see kernel_digest.
+SOURCE_FILES = ["simulator.py", "simulation_log.py", "workload_loader.py", "compiled_workload.py", "metrics.py", "instrumentation.py"]
+
+# kernel.py as a syntax tree dump, so editing its comments and formatting does not throw away cached results.
+# All of it is keyed for every scheduling algorithm: every algorithm goes through Kernel.__init__ and whatever it builds.
+def kernel_digest(source: str) -> str:
+    return hashlib.sha256(ast.dump(ast.parse(source)).encode()).hexdigest()
+
+# Sources are only read once per process.
+@cache
+def source_digest() -> str:
+    digest = hashlib.sha256()
+    digest.update(kernel_digest((SOURCE_DIRECTORY / "kernel.py").read_text()).encode())
+    for name in SOURCE_FILES:
+        digest.update((SOURCE_DIRECTORY / name).read_bytes())
+    return digest.hexdigest()
+
+# Logs and results of finished runs, stored under a hash of everything that decides them: the workload file, the simulator and
+# kernel source and the simulator options. Each entry is a directory holding the log and the result as JSON.
+# Entries are marked as used by their modification time, and the least recently used ones are evicted once the cache is over max_size bytes.
+# Several processes can share a cache, entries are written to a temporary directory and renamed into place.
+class ResultCache:
+    directory: Path
+    max_size: int
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIRECTORY, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, workload_path: Path, options: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(source_digest().encode())
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+        with open(workload_path, 'rb') as file:
+            digest.update(hashlib.file_digest(file, "sha256").digest())
+        return digest.hexdigest()
+
+    # Copies the cached log to log_path and returns the cached result, or returns None on a miss.
+    def get(self, key: str, log_path: Path) -> dict | None:
+        entry = self.directory / key
+        try:
+            with open(entry / RESULT_FILE, 'r') as file:
+                result = json.load(file)
+            shutil.copyfile(entry / LOG_FILE, log_path)
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return result
+
+    def put(self, key: str, log_path: Path, result: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = Path(tempfile.mkdtemp(prefix=".partial-", dir=self.directory))
+        shutil.copyfile(log_path, partial / LOG_FILE)
+        with open(partial / RESULT_FILE, 'w') as file:
+            json.dump(result, file)
+        try:
+            os.rename(partial, self.directory / key)
+        except OSError:
+            # Another process stored the same run first
+            shutil.rmtree(partial, ignore_errors=True)
+        self.evict()
+
+    # (last used, size in bytes, path) of every entry.
+    def entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        if not self.directory.exists():
+            return entries
+        for entry in self.directory.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def size(self) -> int:
+        return sum(size for (_, size, _) in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total_size = sum(size for (_, size, _) in entries)
+        for (_, size, entry) in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+# Runs a workload into log_path unless the same run is already cached. options are Simulator keyword arguments.
+# Returns the result (run stats, scheduling metrics and the error the run ended with, if any) and whether it came from the cache.
+# A workload that cannot be loaded is an error result like any other, without stats or metrics, and is not stored.
+# Only the source files are keyed, so runs that change module constants at runtime (see sweep.py) must not be cached,
+# and neither can kernel profiles, which hold wall-clock times.
+def run_cached(cache: ResultCache, workload_path: Path, log_path: Path, **options) -> tuple[dict, bool]:
+    assert("kernel_profile_path" not in options and "workload" not in options)
+    options = {"student_logs": True, **options}
+    try:
+        key = cache.key(workload_path, options)
+    except Exception:
+        # A workload that cannot be read is not cached, loading it below reports what is wrong with it
+        key = None
+    simulator = None
+    error = None
+    try:
+        if key is not None:
+            result = cache.get(key, log_path)
+            if result is not None:
+                return (result, True)
+        simulator = Simulator(workload_path, str(log_path), **options)
+        collector = MetricsCollector(simulator)
+        simulator.run_simulator()
+    except Exception as e:
+        error = {"type": type(e).__name__, "message": str(e)}
+    if simulator is None:
+        return ({"stats": None, "metrics": None, "error": error}, False)
+
+    result = {
+        "stats": simulator.run_stats(),
+        "metrics": collector.summary().report(),
+        "error": error,
+    }
+    if key is not None:
+        cache.put(key, log_path, result)
+    return (result, False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the simulation result cache.")
+    parser.add_argument("command", choices=["size", "clear"])
+    parser.add_argument("--directory", type=Path, default=DEFAULT_CACHE_DIRECTORY)
+    args = parser.parse_args()
+
+    cache = ResultCache(args.directory)
+    if args.command == "size":
+        entries = cache.entries()
+        print(f"{len(entries)} entries, {sum(size for (_, size, _) in entries) / 1048576:.1f}MB")
+    else:
+        cache.clear()
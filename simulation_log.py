@@ -0,0 +1,309 @@
+import os
+from pathlib import Path
+import pickle
+import shutil
+from typing import Iterator, NamedTuple
+
+MICRO_S = int
+
+# Kinds of simulation events. Each kind with a template is a log record and is formatted with its template when the log is written as text.
+PROCESS_FINISHED: int = 0
+PRIORITY_SET: int = 1
+SEMAPHORE_P_CALLED: int = 2
+SEMAPHORE_V_CALLED: int = 3
+MUTEX_LOCK_CALLED: int = 4
+MUTEX_UNLOCK_CALLED: int = 5
+SEGFAULT: int = 6
+TRAPPED: int = 7
+MEMORY_ACCESSED: int = 8
+SEMAPHORE_INITIALIZED: int = 9
+MUTEX_INITIALIZED: int = 10
+PROCESS_ARRIVED: int = 11
+PROCESS_DROPPED: int = 12
+CONTEXT_SWITCH: int = 13
+STUDENT_LOG: int = 14
+# Marks the end of a tick in which something was logged, written as an empty line.
+SPACING: int = 15
+# Timer interrupts delivered to the kernel, with how many were delivered at once. Not part of the log.
+TIMER_INTERRUPT: int = 16
+NUM_EVENT_KINDS: int = 17
+LOGGED_KINDS = set(range(SPACING + 1))
+
+MB_TO_BYTES: int = 1048576
+
+# One record per kind of simulation event, as handed out by Simulator.iter_events.
+# Subscribers and the log get the fields after time as a plain args tuple in the same order, which is all they store.
+# Addresses and memory sizes are in bytes, times in microseconds.
+class ProcessFinished(NamedTuple):
+    time: MICRO_S
+    pid: int
+    kind = PROCESS_FINISHED
+
+class PrioritySet(NamedTuple):
+    time: MICRO_S
+    pid: int
+    priority: int
+    kind = PRIORITY_SET
+
+class SemaphorePCalled(NamedTuple):
+    time: MICRO_S
+    pid: int
+    semaphore: int
+    kind = SEMAPHORE_P_CALLED
+
+class SemaphoreVCalled(NamedTuple):
+    time: MICRO_S
+    pid: int
+    semaphore: int
+    kind = SEMAPHORE_V_CALLED
+
+class MutexLockCalled(NamedTuple):
+    time: MICRO_S
+    pid: int
+    mutex: int
+    kind = MUTEX_LOCK_CALLED
+
+class MutexUnlockCalled(NamedTuple):
+    time: MICRO_S
+    pid: int
+    mutex: int
+    kind = MUTEX_UNLOCK_CALLED
+
+class Segfault(NamedTuple):
+    time: MICRO_S
+    pid: int
+    virtual_address: int
+    kind = SEGFAULT
+
+class Trapped(NamedTuple):
+    time: MICRO_S
+    pid: int
+    kind = TRAPPED
+
+class MemoryAccessed(NamedTuple):
+    time: MICRO_S
+    pid: int
+    virtual_address: int
+    physical_address: int
+    kind = MEMORY_ACCESSED
+
+class SemaphoreInitialized(NamedTuple):
+    time: MICRO_S
+    semaphore: int
+    value: int
+    kind = SEMAPHORE_INITIALIZED
+
+class MutexInitialized(NamedTuple):
+    time: MICRO_S
+    mutex: int
+    kind = MUTEX_INITIALIZED
+
+class ProcessArrived(NamedTuple):
+    time: MICRO_S
+    process_type: str
+    pid: int
+    priority: int
+    memory_needed: int
+    kind = PROCESS_ARRIVED
+
+# Always about the process that arrived right before it.
+class ProcessDropped(NamedTuple):
+    time: MICRO_S
+    kind = PROCESS_DROPPED
+
+# pid is 0 when the cpu goes idle.
+class ContextSwitch(NamedTuple):
+    time: MICRO_S
+    pid: int
+    kind = CONTEXT_SWITCH
+
+class StudentLog(NamedTuple):
+    time: MICRO_S
+    message: str
+    kind = STUDENT_LOG
+
+class Spacing(NamedTuple):
+    time: MICRO_S
+    kind = SPACING
+
+class TimerInterrupt(NamedTuple):
+    time: MICRO_S
+    num_ticks: int
+    kind = TIMER_INTERRUPT
+
+SimulationEvent = ProcessFinished | PrioritySet | SemaphorePCalled | SemaphoreVCalled | MutexLockCalled | MutexUnlockCalled | Segfault | Trapped | \
+    MemoryAccessed | SemaphoreInitialized | MutexInitialized | ProcessArrived | ProcessDropped | ContextSwitch | StudentLog | Spacing | TimerInterrupt
+
+EVENT_RECORDS: list[type] = [ProcessFinished, PrioritySet, SemaphorePCalled, SemaphoreVCalled, MutexLockCalled, MutexUnlockCalled, Segfault, Trapped, \
+    MemoryAccessed, SemaphoreInitialized, MutexInitialized, ProcessArrived, ProcessDropped, ContextSwitch, StudentLog, Spacing, TimerInterrupt]
+assert(all(record.kind == kind for (kind, record) in enumerate(EVENT_RECORDS)) and len(EVENT_RECORDS) == NUM_EVENT_KINDS)
+
+# Builds the typed record of an event from its raw (time, kind, args).
+def event_record(time: MICRO_S, kind: int, args: tuple) -> SimulationEvent:
+    return EVENT_RECORDS[kind](time, *args)
+
+LOG_TEMPLATES: dict[int, str] = {
+    PROCESS_FINISHED: "Process {} has finished execution and is exiting",
+    PRIORITY_SET: "Process {} set priority to {}",
+    SEMAPHORE_P_CALLED: "Process {} called p on semaphore {}",
+    SEMAPHORE_V_CALLED: "Process {} called v on semaphore {}",
+    MUTEX_LOCK_CALLED: "Process {} called lock on mutex {}",
+    MUTEX_UNLOCK_CALLED: "Process {} called unlock on mutex {}",
+    SEGFAULT: "Process {} tried to access virtual address 0x{:0x} which caused a segfault",
+    TRAPPED: "Process {} has trapped and is forcefully exiting",
+    MEMORY_ACCESSED: "Process {} accessed virtual address 0x{:0x} which translates to physical address 0x{:0x}",
+    SEMAPHORE_INITIALIZED: "Semaphore {} initilized with value {}",
+    MUTEX_INITIALIZED: "Mutex {} initilized",
+    # memory_needed is formatted in MB, see format_records
+    PROCESS_ARRIVED: "{} process {} arrived with priority {} requesting {}MB of memory",
+    PROCESS_DROPPED: "Unable to allocate memory for new process. Dropping process.",
+    CONTEXT_SWITCH: "Context switching to pid: {}",
+    STUDENT_LOG: "{}",
+}
+
+TEXT_LOG: str = "text"
+BINARY_LOG: str = "binary"
+VALID_LOG_FORMATS = {TEXT_LOG, BINARY_LOG}
+
+# Flush once the buffer is full, or at the end of every tick that logged something (useful when tailing a running simulation).
+FLUSH_WHEN_FULL: str = "full"
+FLUSH_EVERY_TICK: str = "tick"
+VALID_FLUSH_POLICIES = {FLUSH_WHEN_FULL, FLUSH_EVERY_TICK}
+
+DEFAULT_LOG_BUFFER_SIZE: int = 65536
+
+# Collects raw (time, kind, args) records in a preallocated buffer and only formats them when the buffer is flushed.
+# Text output is byte-identical to formatting every line as it happens.
+# The binary format skips text formatting entirely and stores each flushed chunk of records as a pickle, see read_binary_log.
+# In a log marked with cpus, the last arg of every record is the cpu it happened on and each line starts with it.
+# A pickled log keeps its buffered records and how far the file had been written, so it flushes the same chunks as if it had never
+# been pickled. An unpickled log has to be reopened before it is used.
+class SimulationLog:
+    times: list[MICRO_S]
+    kinds: list[int]
+    args: list[tuple]
+    num_records: int
+
+    def __init__(self, logfile_path: str, log_format: str = TEXT_LOG, buffer_size: int = DEFAULT_LOG_BUFFER_SIZE, flush_policy: str = FLUSH_WHEN_FULL, \
+                 marks_cpus: bool = False):
+        assert(log_format in VALID_LOG_FORMATS)
+        assert(flush_policy in VALID_FLUSH_POLICIES)
+        assert(buffer_size > 0)
+        self.logfile_path = logfile_path
+        self.log_format = log_format
+        self.flush_policy = flush_policy
+        self.buffer_size = buffer_size
+        self.marks_cpus = marks_cpus
+        self.times = [0] * buffer_size
+        self.kinds = [0] * buffer_size
+        self.args = [()] * buffer_size
+        self.num_records = 0
+        if log_format == BINARY_LOG:
+            self.file = open(logfile_path, 'wb')
+        else:
+            self.file = open(logfile_path, 'w')
+
+    def record(self, time: MICRO_S, kind: int, args: tuple):
+        i = self.num_records
+        self.times[i] = time
+        self.kinds[i] = kind
+        self.args[i] = args
+        self.num_records = i + 1
+        if self.num_records == self.buffer_size:
+            self.flush()
+
+    def end_tick(self, time: MICRO_S):
+        self.record(time, SPACING, ())
+        if self.flush_policy == FLUSH_EVERY_TICK:
+            self.flush()
+
+    def flush(self):
+        if self.num_records == 0:
+            return
+        n = self.num_records
+        if self.log_format == BINARY_LOG:
+            pickle.dump((self.times[:n], self.kinds[:n], self.args[:n]), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            self.file.write(format_records(self.times, self.kinds, self.args, n, self.marks_cpus))
+        self.num_records = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __getstate__(self) -> dict:
+        self.file.flush()
+        n = self.num_records
+        state = self.__dict__.copy()
+        del state["file"]
+        state["times"] = self.times[:n]
+        state["kinds"] = self.kinds[:n]
+        state["args"] = self.args[:n]
+        state["file_size"] = self.file.tell()
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        padding = self.buffer_size - self.num_records
+        self.times += [0] * padding
+        self.kinds += [0] * padding
+        self.args += [()] * padding
+        self.file = None
+
+    # Carries on an unpickled log from where it was pickled, dropping whatever was written to the file after that.
+    # With a logfile_path the log carries on in that file instead, starting from a copy of the log up to that point.
+    def reopen(self, logfile_path: str | None = None):
+        if logfile_path is not None and Path(logfile_path) != Path(self.logfile_path):
+            with open(self.logfile_path, 'rb') as source, open(logfile_path, 'wb') as destination:
+                shutil.copyfileobj(source, destination)
+            self.logfile_path = logfile_path
+        with open(self.logfile_path, 'r+b') as file:
+            if file.seek(0, os.SEEK_END) < self.file_size:
+                raise ValueError(f"{self.logfile_path} is shorter than when the log was saved")
+            file.truncate(self.file_size)
+        if self.log_format == BINARY_LOG:
+            self.file = open(self.logfile_path, 'ab')
+        else:
+            self.file = open(self.logfile_path, 'a')
+
+# Formats the first n records as the text log.
+def format_records(times: list[MICRO_S], kinds: list[int], args: list[tuple], n: int, marks_cpus: bool = False) -> str:
+    lines = []
+    templates = LOG_TEMPLATES
+    formatted_time = None
+    last_time = None
+    for i in range(n):
+        kind = kinds[i]
+        if kind == SPACING:
+            lines.append("\n")
+            continue
+        time = times[i]
+        # Records from the same tick share their time, so it is only formatted once per tick
+        if time != last_time:
+            formatted_time = f"{time / 1000:.3f}ms"
+            last_time = time
+        delimiter = '#' if kind == STUDENT_LOG else ':'
+        record_args = args[i]
+        if kind == PROCESS_ARRIVED:
+            record_args = record_args[:3] + (record_args[3] / MB_TO_BYTES,) + record_args[4:]
+        if marks_cpus:
+            lines.append(f"{formatted_time} {delimiter} [cpu {record_args[-1]}] {templates[kind].format(*record_args[:-1])}\n")
+            continue
+        lines.append(f"{formatted_time} {delimiter} {templates[kind].format(*record_args)}\n")
+    return "".join(lines)
+
+# Yields every (time, kind, args) record of a binary log in order.
+def read_binary_log(logfile_path: str) -> Iterator[tuple[MICRO_S, int, tuple]]:
+    with open(logfile_path, 'rb') as file:
+        while True:
+            try:
+                times, kinds, args = pickle.load(file)
+            except EOFError:
+                return
+            yield from zip(times, kinds, args)
+
+# Converts a binary log to the text format.
+def binary_log_to_text(binary_path: str, text_path: str, marks_cpus: bool = False):
+    records = list(read_binary_log(binary_path))
+    with open(text_path, 'w') as file:
+        file.write(format_records([r[0] for r in records], [r[1] for r in records], [r[2] for r in records], len(records), marks_cpus))
@@ -1,13 +1,26 @@
-from io import TextIOWrapper
+import gzip
 import json
+import operator
 from dataclasses import dataclass
+import os
 from pathlib import Path
+import pickle
 import sys
+from typing import Callable, Iterable, Iterator
 
-from kernel import Kernel, MMU
+from kernel import Kernel, MMU, FOREGROUND, SEMAPHORE, MUTEX, VALID_PAGE_REPLACEMENTS
+from instrumentation import KernelInstrumentation
+from workload_loader import EagerArrivals, StreamingArrivals, read_workload_metadata
+from compiled_workload import CompiledWorkload, CompiledArrivals, is_compiled_workload, write_compiled_workload, INT64_MIN, INT64_MAX
+from simulation_log import SimulationLog, TEXT_LOG, DEFAULT_LOG_BUFFER_SIZE, FLUSH_WHEN_FULL, VALID_LOG_FORMATS, VALID_FLUSH_POLICIES, \
+    PROCESS_FINISHED, PRIORITY_SET, SEMAPHORE_P_CALLED, SEMAPHORE_V_CALLED, MUTEX_LOCK_CALLED, MUTEX_UNLOCK_CALLED, SEGFAULT, TRAPPED, \
+    MEMORY_ACCESSED, SEMAPHORE_INITIALIZED, MUTEX_INITIALIZED, PROCESS_ARRIVED, PROCESS_DROPPED, CONTEXT_SWITCH, STUDENT_LOG, SPACING, \
+    TIMER_INTERRUPT, NUM_EVENT_KINDS, LOGGED_KINDS, SimulationEvent, event_record
 
 MICRO_S = int
 PID = int
+# Called with (time, kind, args) for every event of the kinds it subscribed to, args being the fields of the kind's record in simulation_log.py.
+Subscriber = Callable[[MICRO_S, int, tuple], None]
 
 NUM_MICRO_IN_SEC: MICRO_S = 1000000
 TIMER_INTERRUPT_INTERVAL: MICRO_S = 10
@@ -15,6 +28,8 @@ MB_TO_BYTES: int = 1048576
 
 VALID_SCHEDULING_ALGORITHMS = {"FCFS", "Priority", "RR", "Multilevel"}
 VALID_PROCESS_TYPES = {"Foreground", "Background"}
+# Processes WorkloadValidator checks at a time. Bounds what it holds on to while processes are streamed.
+VALIDATION_BATCH_SIZE: int = 4096
 
 PROCESSES: str = "processes"
 ARRIVAL: str = "arrival"
@@ -45,20 +60,35 @@ DEFAULT_PRIORITY = 32
 class SimulationError(Exception):
     pass
 
+# Everything wrong with a simulation description, see WorkloadValidator.
+class WorkloadError(Exception):
+    errors: list[str]
+
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        shown = errors[:MAX_REPORTED_WORKLOAD_ERRORS]
+        more = f"\n  ... and {len(errors) - len(shown)} more" if len(errors) > len(shown) else ""
+        super().__init__(f"{len(errors)} error(s) in the simulation description:\n  " + "\n  ".join(shown) + more)
+
+MAX_REPORTED_WORKLOAD_ERRORS: int = 100
+
+# Kinds of process events. When several events become due on the same tick they are dispatched in this order.
+PRIORITY_CHANGE_EVENT: int = 0
+SEMAPHORE_P_EVENT: int = 1
+SEMAPHORE_V_EVENT: int = 2
+MUTEX_LOCK_EVENT: int = 3
+MUTEX_UNLOCK_EVENT: int = 4
+MEMORY_EVENT: int = 5
+# Events that release a semaphore or mutex, with the kind of resource they release.
+RELEASE_EVENTS: dict[int, str] = {SEMAPHORE_V_EVENT: SEMAPHORE, MUTEX_UNLOCK_EVENT: MUTEX}
+
+# A single event in a process's timeline.
+# value is the new priority, the semaphore/mutex id or the memory address depending on kind.
 @dataclass
-class PriorityChangeEvent:
+class ProcessEvent:
     arrival: MICRO_S
-    new_priority: int
-
-@dataclass
-class SemaphoreCallEvent:
-    arrival: MICRO_S
-    id: int
-
-@dataclass
-class MutexEvent:
-    arrival: MICRO_S
-    id: int
+    kind: int
+    value: int
 
 @dataclass
 class Semaphore:
@@ -69,289 +99,585 @@ class Semaphore:
 class Mutex:
     initilized: bool
 
-@dataclass
-class MemoryEvent:
-    arrival: MICRO_S
-    address: int
-
 @dataclass
 class Process:
     arrival: MICRO_S
     total_cpu_time: MICRO_S
     elapsed_cpu_time: MICRO_S
     priority: int
-    priority_change_events: list[PriorityChangeEvent]
-    semaphore_p_events: list[SemaphoreCallEvent]
-    semaphore_v_events: list[SemaphoreCallEvent]
-    mutex_lock_events: list[MutexEvent]
-    mutex_unlock_events: list[MutexEvent]
+    # All of the process's events sorted by when they are dispatched, next_event is the index of the next one to dispatch.
+    events: list[ProcessEvent]
+    next_event: int
     process_type: str
     memory_needed: int
-    memory_events: list[MemoryEvent]
+
+# Everything a simulation needs from its description file.
+@dataclass
+class Workload:
+    scheduling_algorithm: str
+    memory_size: int
+    semaphores: dict[int, Semaphore]
+    mutexes: dict[int, Mutex]
+    arrivals: "EagerArrivals | StreamingArrivals | CompiledArrivals"
 
 class Simulator:
     elapsed_time: MICRO_S
     current_process: PID
     processes: dict[PID, Process]
-    arrivals: list[Process]
+    arrivals: EagerArrivals | StreamingArrivals | CompiledArrivals
     kernel: Kernel
     next_pid: PID
-    simlog: TextIOWrapper
+    simlog: SimulationLog | None
+    subscribers: list[list[Subscriber]]
     needs_spacing: False
     process_0_runtime: MICRO_S
     semaphores: dict[int, Semaphore]
     mutexes: dict[int, Mutex]
     student_logs: "StudentLogger"
     mmu: MMU
-
-    def __init__(self, emulation_description_path: Path, logfile_path: str, student_logs: bool):
+    kernel_instrumentation: KernelInstrumentation | None
+    kernel_profile_path: Path | None
+    tickless: bool
+    pending_timer_ticks: int
+    timer_wakeup: int | None
+    timer_wakeup_stale: bool
+    num_cpus: int
+    current_cpu: int
+    cpu_processes: list[PID]
+    cpu_busy_time: list[MICRO_S]
+    last_cpu: dict[PID, int]
+    migrations: int
+    checkpoint_path: Path | None
+    checkpoint_interval: MICRO_S | None
+    next_checkpoint_time: MICRO_S | None
+
+    def __init__(self, emulation_description_path: Path | None, logfile_path: str | None, student_logs: bool, log_format: str = TEXT_LOG, \
+                 log_buffer_size: int = DEFAULT_LOG_BUFFER_SIZE, log_flush_policy: str = FLUSH_WHEN_FULL, kernel_profile_path: Path | None = None, stream_processes: bool = False, \
+                 tickless: bool = False, page_replacement: str | None = None, scheduling_algorithm: str | None = None, \
+                 workload: Workload | None = None, num_cpus: int = 1, checkpoint_path: Path | None = None, \
+                 checkpoint_interval: MICRO_S | None = None):
+        # Tickless mode skips timer interrupts by asking one kernel for its next wake-up, which does not cover several cpus
+        assert(num_cpus >= 1 and not (tickless and num_cpus > 1))
         self.elapsed_time = 0
         self.current_process = 0
         self.processes = dict()
-        self.arrivals = []
         self.next_pid = 1
         self.needs_spacing = False
         self.process_0_runtime = 0
-        self.semaphores = dict()
-        self.mutexes = dict()
+        self.tickless = tickless
+        self.pending_timer_ticks = 0
+        self.timer_wakeup = None
+        self.timer_wakeup_stale = True
+        self.num_cpus = num_cpus
+        self.current_cpu = 0
+        self.cpu_processes = [0] * num_cpus
+        # Cpus another cpu switched to a different process during the current microsecond, see step_smp
+        self.switched_cpus = set()
+        self.cpu_busy_time = [0] * num_cpus
+        self.last_cpu = dict()
+        self.migrations = 0
+        # How many v() and unlock() calls each live process has left on each (SEMAPHORE or MUTEX, id), and the other way around
+        # the processes that still release each one, not counting those blocked on it, and how many of them are not blocked at all.
+        # Kept up to date as processes arrive, release, block, wake and exit, see check_for_deadlock.
+        self.releases = dict()
+        self.releasers = dict()
+        self.free_releasers = dict()
+        # Every checkpoint_interval simulated microseconds the state is saved to checkpoint_path, replacing the last checkpoint
+        assert(checkpoint_interval is None or (checkpoint_path is not None and checkpoint_interval > 0))
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.next_checkpoint_time = checkpoint_interval
         if student_logs:
             self.student_logs = StudentLogger(self)
         else:
             self.student_logs = StudentLogger(None)
 
-        emulation_json = None
-        with open(emulation_description_path, 'r') as file:
-            emulation_json = json.load(file)
+        # An already loaded workload can be passed instead of a path. The simulator consumes it, so it can only be run once.
+        if workload is None:
+            workload = load_workload(emulation_description_path, stream_processes)
+        self.semaphores = workload.semaphores
+        self.mutexes = workload.mutexes
+        self.arrivals = workload.arrivals
 
-        if SEMAPHORES in emulation_json:
-            assert(type(emulation_json[SEMAPHORES]) is list)
-            for semaphore in emulation_json[SEMAPHORES]:
-                assert(SEMAPHORE_ID in semaphore and type(semaphore[SEMAPHORE_ID]) is int)
-                assert(SEMAPHORE_INIT_VAL in semaphore and type(semaphore[SEMAPHORE_INIT_VAL]) is int)
-                assert(semaphore[SEMAPHORE_ID] not in self.semaphores)
-                self.semaphores[semaphore[SEMAPHORE_ID]] = Semaphore(semaphore[SEMAPHORE_INIT_VAL], False)
-        
-        if MUTEXES in emulation_json:
-            assert(type(emulation_json[MUTEXES]) is list)
-            for mutex_id in emulation_json[MUTEXES]:
-                assert(type(mutex_id) is int)
-                self.mutexes[mutex_id] = Mutex(False)
-
-        assert(PROCESSES in emulation_json and type(emulation_json[PROCESSES]) is list)
-        for process in emulation_json[PROCESSES]:
-            assert(ARRIVAL in process and type(process[ARRIVAL]) is MICRO_S)
-            assert(TOTAL_CPU_TIME in process and type(process[TOTAL_CPU_TIME]) is MICRO_S)
-            
-            priority = DEFAULT_PRIORITY
-            if PRIORITY in process:
-                assert(type(process[PRIORITY]) is int)
-                priority = process[PRIORITY]
-
-            priority_changes = []
-            if PRIORITY_CHANGES in process:
-                assert(type(process[PRIORITY_CHANGES]) is list)
-                for change in process[PRIORITY_CHANGES]:
-                    assert(EVENT_ARRIVAL in change and type(change[EVENT_ARRIVAL]) is int)
-                    assert(NEW_PRIORITY in change and type(change[NEW_PRIORITY]) is int)
-                    priority_changes.append(PriorityChangeEvent(change[EVENT_ARRIVAL], change[NEW_PRIORITY]))
-
-            semaphore_p_events = list()
-            semaphore_v_events = list()
-            if PROCESS_SEMAPHORE in process:
-                assert(type(process[PROCESS_SEMAPHORE]) is list)
-                for event in process[PROCESS_SEMAPHORE]:
-                    assert(PROCESSES_SEMA_ID in event and type(event[PROCESSES_SEMA_ID]) is int)
-                    id = event[PROCESSES_SEMA_ID]
-                    assert(PROCESS_SEMA_P in event or PROCESS_SEMA_V in event)
-                    if PROCESS_SEMA_P in event:
-                        assert(type(event[PROCESS_SEMA_P]) is int)
-                        semaphore_p_events.append(SemaphoreCallEvent(event[PROCESS_SEMA_P], id))
-                    elif PROCESS_SEMA_V in event:
-                        assert(type(event[PROCESS_SEMA_V]) is int)
-                        semaphore_v_events.append(SemaphoreCallEvent(event[PROCESS_SEMA_V], id))
-
-            mutex_lock_events = list()
-            mutex_unlock_events = list()
-            if PROCESS_MUTEX in process:
-                assert(type(process[PROCESS_MUTEX]) is list)
-                for event in process[PROCESS_MUTEX]:
-                    assert(PROCESSES_MUTEX_ID in event and type(event[PROCESSES_MUTEX_ID]) is int)
-                    id = event[PROCESSES_MUTEX_ID]
-                    assert(PROCESS_MUTEX_LOCK in event or PROCESS_MUTEX_UNLOCK in event)
-                    if PROCESS_MUTEX_LOCK in event:
-                        assert(type(event[PROCESS_MUTEX_LOCK]) is int)
-                        mutex_lock_events.append(MutexEvent(event[PROCESS_MUTEX_LOCK], id))
-                    elif PROCESS_MUTEX_UNLOCK in event:
-                        assert(type(event[PROCESS_MUTEX_UNLOCK]) is int)
-                        mutex_unlock_events.append(MutexEvent(event[PROCESS_MUTEX_UNLOCK], id))
-
-            process_type = "Foreground"
-            if PROCESS_TYPE in process:
-                assert(process[PROCESS_TYPE] in VALID_PROCESS_TYPES)
-                process_type = process[PROCESS_TYPE]
-
-            # Default memory needed
-            memory_needed_mb = 10
-            if PROCESS_MEMORY_NEEDED in process:
-                assert(type(process[PROCESS_MEMORY_NEEDED]) is int)
-                memory_needed_mb = process[PROCESS_MEMORY_NEEDED]
-
-            memory_events = []
-            if PROCESS_MEMORY_ACCESS in process:
-                assert(type(process[PROCESS_MEMORY_ACCESS]) is list)
-                for access_list in process[PROCESS_MEMORY_ACCESS]:
-                    assert(type(access_list) is dict)
-                    for (address_str, arrival) in access_list.items():
-                        assert(type(address_str) is str and type(arrival) is int)
-                        try:
-                            address = int(address_str, base=0)
-                        except ValueError:
-                            assert(False)
-                        memory_events.append(MemoryEvent(arrival, address))
-
-            # Sort all event lists such that their last element is always the next event
-            for event_list in [priority_changes, semaphore_p_events, semaphore_v_events, mutex_lock_events, mutex_unlock_events, memory_events]:
-                event_list.sort(key=lambda c: c.arrival, reverse=True)
-
-
-            process = Process(process[ARRIVAL], process[TOTAL_CPU_TIME], 0, priority, priority_changes, \
-                              semaphore_p_events, semaphore_v_events, mutex_lock_events, mutex_unlock_events, \
-                                process_type, memory_needed_mb * MB_TO_BYTES, memory_events)
-            assert_events_are_valid_and_not_at_same_time(process)
-            self.arrivals.append(process)
-        # Sort arrivals so earliest arrivals are at the end.
-        self.arrivals.sort(key=lambda p: p.arrival, reverse=True)
-
-        # Default memory size
-        memory_size_mb = 1000
+        self.mmu = MMU(self.student_logs)
+        # Demand paging has to be chosen before the kernel hands the MMU its memory
+        if page_replacement is not None:
+            self.mmu.page_replacement = page_replacement
+        # The workload's scheduling algorithm can be overridden to compare algorithms on the same processes
+        if scheduling_algorithm is None:
+            scheduling_algorithm = workload.scheduling_algorithm
+        assert(scheduling_algorithm in VALID_SCHEDULING_ALGORITHMS)
+        self.kernel = Kernel(scheduling_algorithm, self.student_logs, self.mmu, workload.memory_size)
+        if num_cpus > 1:
+            self.kernel.init_cpus(num_cpus)
+            self.step = self.step_smp
+
+        # Kernel calls are only wrapped when profiling was asked for, otherwise the simulator calls the kernel directly
+        self.kernel_profile_path = kernel_profile_path
+        self.kernel_instrumentation = None
+        if kernel_profile_path is not None:
+            self.kernel_instrumentation = KernelInstrumentation(self)
+
+        # The log file is just the first subscriber. Without a log path nothing is written and events only go to subscribers.
+        self.subscribers = [[] for _ in range(NUM_EVENT_KINDS)]
+        self.simlog = None
+        if logfile_path is not None:
+            self.simlog = SimulationLog(logfile_path, log_format, log_buffer_size, log_flush_policy, num_cpus > 1)
+            self.subscribe_log()
+
+    def subscribe_log(self):
+        simlog = self.simlog
+        if self.num_cpus > 1:
+            self.subscribe(lambda time, kind, args: simlog.record(time, kind, args + (self.current_cpu,)), LOGGED_KINDS - {SPACING})
+        else:
+            self.subscribe(simlog.record, LOGGED_KINDS - {SPACING})
+        self.subscribe(lambda time, kind, args: simlog.end_tick(time), [SPACING])
+
+    # Calls subscriber with (time, kind, args) for every event of the given kinds (every kind by default), in the order they happen.
+    # Kinds are defined in simulation_log.py. With more than one cpu, current_cpu is the cpu the event happened on.
+    def subscribe(self, subscriber: Subscriber, kinds: Iterable[int] | None = None):
+        if kinds is None:
+            kinds = range(NUM_EVENT_KINDS)
+        for kind in kinds:
+            self.subscribers[kind].append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for kind_subscribers in self.subscribers:
+            if subscriber in kind_subscribers:
+                kind_subscribers.remove(subscriber)
 
-        if MEMORY_SIZE in emulation_json:
-            assert(type(emulation_json[MEMORY_SIZE]) is int)
-            memory_size_mb = emulation_json[MEMORY_SIZE]
+    def run_simulator(self):
+        try:
+            self.run_until_done()
+        finally:
+            self.finish()
+
+    # Runs the simulation, yielding the records of its events of the given kinds (every kind by default) as they happen.
+    def iter_events(self, kinds: Iterable[int] | None = None) -> Iterator[SimulationEvent]:
+        events = []
+        collect = lambda time, kind, args: events.append(event_record(time, kind, args))
+        self.subscribe(collect, kinds)
+        try:
+            while not self.finished():
+                self.step()
+                yield from events
+                events.clear()
+        finally:
+            self.finish()
+            self.unsubscribe(collect)
+        # Timer interrupts delivered while finishing
+        yield from events
+
+    def finish(self):
+        # Leave the kernel's tick counters as if every timer interrupt had been delivered
+        self.sync_timer()
+        # Whatever was logged before an error still reaches the log file
+        if self.simlog is not None:
+            self.simlog.close()
+        if self.kernel_instrumentation is not None:
+            self.kernel_instrumentation.write_report(self.kernel_profile_path)
+
+    # Emulation ends when all processes have finished.
+    def finished(self) -> bool:
+        return len(self.processes) == 0 and not self.arrivals.has_next()
+
+    def run_until_done(self):
+        if self.checkpoint_interval is None:
+            while len(self.processes) > 0 or self.arrivals.has_next():
+                self.step()
+            return
 
-        self.mmu = MMU(self.student_logs)
+        while len(self.processes) > 0 or self.arrivals.has_next():
+            self.step()
+            if self.elapsed_time >= self.next_checkpoint_time and not self.finished():
+                self.next_checkpoint_time = (self.elapsed_time // self.checkpoint_interval + 1) * self.checkpoint_interval
+                self.checkpoint(self.checkpoint_path)
+
+    # Saves the complete state of the simulation between two steps, see resume_simulator.
+    # The log is flushed and only how far it had been written is saved, not its contents.
+    # Subscribers are not saved and have to subscribe again after resuming, apart from the log.
+    # The file is written next to path first and then renamed, so an existing checkpoint is only replaced by a complete one.
+    def checkpoint(self, path: Path):
+        partial_path = Path(f"{path}.partial")
+        if self.kernel_instrumentation is not None:
+            self.kernel_instrumentation.unwrap_kernel()
+        try:
+            with gzip.open(partial_path, 'wb', compresslevel=1) as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            if self.kernel_instrumentation is not None:
+                self.kernel_instrumentation.wrap_kernel()
+        os.replace(partial_path, path)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["subscribers"]
+        # The SMP step is set per instance
+        state.pop("step", None)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if self.num_cpus > 1:
+            self.step = self.step_smp
+        self.subscribers = [[] for _ in range(NUM_EVENT_KINDS)]
+        if self.simlog is not None:
+            self.subscribe_log()
+        if self.kernel_instrumentation is not None:
+            self.kernel_instrumentation.wrap_kernel()
+
+    # Simulates one microsecond, then skips ahead over the quiet ones after it.
+    def step(self):
+        if self.current_process == 0:
+            self.process_0_runtime += 1
+        if self.process_0_runtime >= NUM_MICRO_IN_SEC:
+            self.raise_idle_limit()
+        
+        self.advance_current_process()
 
-        assert("scheduling_algorithm" in emulation_json and emulation_json["scheduling_algorithm"] in VALID_SCHEDULING_ALGORITHMS)
-        self.kernel = Kernel(emulation_json["scheduling_algorithm"], self.student_logs, self.mmu, memory_size_mb * MB_TO_BYTES)
+        self.check_for_arrival()
 
-        self.simlog = open(logfile_path, 'w')
+        if self.elapsed_time != 0 and self.elapsed_time % TIMER_INTERRUPT_INTERVAL == 0:
+            if self.tickless:
+                self.timer_tick()
+            else:
+                self.switch_process(self.kernel.timer_interrupt())
+                if len(self.subscribers[TIMER_INTERRUPT]) > 0:
+                    self.notify_timer(1)
 
-    
-    def run_simulator(self):
-        # Emulation ends when all processes have finished.
-        while len(self.processes) + len(self.arrivals) > 0:
-            if self.current_process == 0:
-                self.process_0_runtime += 1
-            if self.process_0_runtime >= NUM_MICRO_IN_SEC:
-                raise SimulationError( \
-                """Process 0 (idle process) has been running for 1 second straight. 
-                This will not happen in tested simulations and is likely a bug in the kernel.""")
-            
-            self.advance_current_process()
+        self.log_add_spacing()
+        self.elapsed_time += 1
+        self.skip_quiet_ticks()
 
-            self.check_for_arrival()
+    def raise_idle_limit(self):
+        raise SimulationError( \
+            """Process 0 (idle process) has been running for 1 second straight. 
+                This will not happen in tested simulations and is likely a bug in the kernel.""")
 
-            if self.elapsed_time != 0 and self.elapsed_time % TIMER_INTERRUPT_INTERVAL == 0:
+    # SMP mode: step with num_cpus cpus. Each cpu runs its own process for the microsecond, in cpu order,
+    # and at every timer interval each cpu gets its own timer interrupt. Arrivals are handled on cpu 0.
+    # The idle limit applies to the time in which every cpu was idle.
+    def step_smp(self):
+        if not any(self.cpu_processes):
+            self.process_0_runtime += 1
+        if self.process_0_runtime >= NUM_MICRO_IN_SEC:
+            self.raise_idle_limit()
+
+        # A process switched to while the cpus before its own run only starts running in the next microsecond,
+        # the same as one switched to on an earlier cpu or by its own cpu
+        self.switched_cpus.clear()
+        for cpu in range(self.num_cpus):
+            self.select_cpu(cpu)
+            if self.current_process != 0 and cpu not in self.switched_cpus:
+                self.cpu_busy_time[cpu] += 1
+                self.advance_current_process()
+
+        self.select_cpu(0)
+        self.check_for_arrival()
+
+        if self.elapsed_time != 0 and self.elapsed_time % TIMER_INTERRUPT_INTERVAL == 0:
+            for cpu in range(self.num_cpus):
+                self.select_cpu(cpu)
                 self.switch_process(self.kernel.timer_interrupt())
+            if len(self.subscribers[TIMER_INTERRUPT]) > 0:
+                self.notify_timer(1)
+
+        self.log_add_spacing()
+        self.elapsed_time += 1
+        self.skip_quiet_ticks_smp()
+
+    # Makes cpu the one the simulator runs and the kernel answers for.
+    def select_cpu(self, cpu: int):
+        self.current_cpu = cpu
+        self.current_process = self.cpu_processes[cpu]
+        self.kernel.set_cpu(cpu)
+
+    # Tickless mode: a timer interrupt the kernel has not asked for is only counted,
+    # and counted interrupts are delivered together right before the kernel is next called.
+    def timer_tick(self):
+        wakeup = self.ticks_until_timer_wakeup()
+        if wakeup is None or self.pending_timer_ticks + 1 < wakeup:
+            self.pending_timer_ticks += 1
+        else:
+            self.sync_timer()
+            self.switch_process(self.kernel.timer_interrupt())
+            self.notify_timer(1)
+
+    # Delivers the counted timer interrupts. Must be called before every kernel call.
+    def sync_timer(self):
+        if not self.tickless:
+            return
+        if self.pending_timer_ticks > 0:
+            num_ticks = self.pending_timer_ticks
+            self.pending_timer_ticks = 0
+            if self.kernel.timer_interrupts(num_ticks) != self.current_process:
+                raise SimulationError(f"Kernel switched process during {num_ticks} timer interrupts it declared it did not need")
+            self.notify_timer(num_ticks)
+        # The kernel is about to change, so its wake-up has to be asked for again
+        self.timer_wakeup_stale = True
+
+    # Ticks, counted from the last kernel call, until the timer interrupt the kernel needs delivered.
+    def ticks_until_timer_wakeup(self) -> int | None:
+        if self.timer_wakeup_stale:
+            self.timer_wakeup = self.kernel.next_timer_wakeup()
+            self.timer_wakeup_stale = False
+        return self.timer_wakeup
+
+    # Time of the next timer interrupt that has to go through the loop, or None if there is none until the kernel is next called.
+    def next_timer_interrupt_time(self) -> MICRO_S | None:
+        next_interrupt = ((self.elapsed_time + TIMER_INTERRUPT_INTERVAL - 1) // TIMER_INTERRUPT_INTERVAL) * TIMER_INTERRUPT_INTERVAL
+        if next_interrupt == 0:
+            next_interrupt = TIMER_INTERRUPT_INTERVAL
+        if self.tickless:
+            wakeup = self.ticks_until_timer_wakeup()
+            if wakeup is None:
+                return None
+            next_interrupt += (wakeup - self.pending_timer_ticks - 1) * TIMER_INTERRUPT_INTERVAL
+        return next_interrupt
+
+    # Jumps over every upcoming microsecond in which nothing observable happens.
+    # A tick is quiet if no process arrives, no timer interrupt fires, the current process neither finishes nor reaches its next event,
+    # and the idle process is not about to hit the one second limit. Skipping them produces exactly the same log as ticking through them.
+    # In tickless mode only the timer interrupts the kernel asked for count, the ones skipped over are counted as pending.
+    def skip_quiet_ticks(self):
+        if len(self.processes) == 0 and not self.arrivals.has_next():
+            return
+
+        if self.current_process == 0:
+            next_interesting_time = self.elapsed_time + NUM_MICRO_IN_SEC - self.process_0_runtime - 1
+        else:
+            current_process = self.processes[self.current_process]
+            next_interesting_time = self.elapsed_time + next_process_event_cpu_time(current_process) - current_process.elapsed_cpu_time - 1
+
+        next_timer_interrupt = self.next_timer_interrupt_time()
+        if next_timer_interrupt is not None:
+            next_interesting_time = min(next_interesting_time, next_timer_interrupt)
+
+        if self.arrivals.has_next():
+            next_interesting_time = min(next_interesting_time, self.arrivals.next_arrival_time())
+
+        num_quiet_ticks = next_interesting_time - self.elapsed_time
+        if num_quiet_ticks <= 0:
+            return
+
+        if self.tickless:
+            self.pending_timer_ticks += (next_interesting_time - 1) // TIMER_INTERRUPT_INTERVAL - (self.elapsed_time - 1) // TIMER_INTERRUPT_INTERVAL
+        if self.current_process == 0:
+            self.process_0_runtime += num_quiet_ticks
+        else:
+            self.processes[self.current_process].elapsed_cpu_time += num_quiet_ticks
+        self.elapsed_time += num_quiet_ticks
 
-            self.log_add_spacing()
-            self.elapsed_time += 1
-        self.simlog.close()
+    # skip_quiet_ticks for SMP mode, where a tick is only quiet if it is quiet on every cpu.
+    def skip_quiet_ticks_smp(self):
+        if len(self.processes) == 0 and not self.arrivals.has_next():
+            return
+
+        running = [(cpu, pid) for cpu, pid in enumerate(self.cpu_processes) if pid != 0]
+        if len(running) == 0:
+            next_interesting_time = self.elapsed_time + NUM_MICRO_IN_SEC - self.process_0_runtime - 1
+        else:
+            next_interesting_time = min(self.elapsed_time + next_process_event_cpu_time(self.processes[pid]) - self.processes[pid].elapsed_cpu_time - 1 \
+                                        for (_, pid) in running)
+
+        next_interesting_time = min(next_interesting_time, self.next_timer_interrupt_time())
+        if self.arrivals.has_next():
+            next_interesting_time = min(next_interesting_time, self.arrivals.next_arrival_time())
+
+        num_quiet_ticks = next_interesting_time - self.elapsed_time
+        if num_quiet_ticks <= 0:
+            return
+
+        if len(running) == 0:
+            self.process_0_runtime += num_quiet_ticks
+        for (cpu, pid) in running:
+            self.processes[pid].elapsed_cpu_time += num_quiet_ticks
+            self.cpu_busy_time[cpu] += num_quiet_ticks
+        self.elapsed_time += num_quiet_ticks
 
     def advance_current_process(self):
         if self.current_process == 0:
             return
         
-        current_process = self.processes[self.current_process]
+        owner = self.current_process
+        current_process = self.processes[owner]
         current_process.elapsed_cpu_time += 1
 
         # If the current_process has finished execution
         if current_process.total_cpu_time <= current_process.elapsed_cpu_time:
-            self.log(f"Process {self.current_process} has finished execution and is exiting")
+            self.log(PROCESS_FINISHED, self.current_process)
             self.exit_current_process()
             return
 
 
-        event_list = current_process.priority_change_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            priority_change = event_list.pop()
-            self.log(f"Process {self.current_process} set priority to {priority_change.new_priority}")
-            self.switch_process(self.kernel.syscall_set_priority(priority_change.new_priority))
-
-
-        event_list = current_process.semaphore_p_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            semaphore_p = event_list.pop()
-            self.check_semaphore_inited(semaphore_p.id)
-            self.log(f"Process {self.current_process} called p on semaphore {semaphore_p.id}")
-            self.switch_process(self.kernel.syscall_semaphore_p(semaphore_p.id))
-        
-        event_list = current_process.semaphore_v_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            semaphore_v = event_list.pop()
-            self.check_semaphore_inited(semaphore_v.id)
-            self.log(f"Process {self.current_process} called v on semaphore {semaphore_v.id}")
-            self.switch_process(self.kernel.syscall_semaphore_v(semaphore_v.id))
-
-
-        event_list = current_process.mutex_lock_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            mutex_lock = event_list.pop()
-            self.check_mutex_inited(mutex_lock.id)
-            self.log(f"Process {self.current_process} called lock on mutex {mutex_lock.id}")
-            self.switch_process(self.kernel.syscall_mutex_lock(mutex_lock.id))
-        
-        event_list = current_process.mutex_unlock_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            mutex_unlock = event_list.pop()
-            self.check_mutex_inited(mutex_unlock.id)
-            self.log(f"Process {self.current_process} called unlock on mutex {mutex_unlock.id}")
-            self.switch_process(self.kernel.syscall_mutex_unlock(mutex_unlock.id))
-
-        event_list = current_process.memory_events
-        while len(event_list) > 0 and event_list[len(event_list) - 1].arrival <= current_process.elapsed_cpu_time:
-            memory_event = event_list.pop()
-            translation = self.mmu.translate(memory_event.address, self.current_process)
-            if translation is None:
-                self.log(f"Process {self.current_process} tried to access virtual address 0x{memory_event.address:0x} which caused a segfault")
-                self.log(f"Process {self.current_process} has trapped and is forcefully exiting")
-                self.exit_current_process()
-            else:
-                self.log(f"Process {self.current_process} accessed virtual address 0x{memory_event.address:0x} which translates to physical address 0x{translation:0x}")
+        events = current_process.events
+        while current_process.next_event < len(events) and event_dispatch_time(events[current_process.next_event]) <= current_process.elapsed_cpu_time:
+            event = events[current_process.next_event]
+            current_process.next_event += 1
+            if event.kind != MEMORY_EVENT:
+                self.sync_timer()
+            if event.kind == PRIORITY_CHANGE_EVENT:
+                self.log(PRIORITY_SET, self.current_process, event.value)
+                self.switch_process(self.kernel.syscall_set_priority(event.value))
+            elif event.kind == SEMAPHORE_P_EVENT:
+                self.check_semaphore_inited(event.value)
+                self.log(SEMAPHORE_P_CALLED, self.current_process, event.value)
+                pid = self.current_process
+                self.switch_process(self.kernel.syscall_semaphore_p(event.value))
+                if pid in self.kernel.blocked_on:
+                    self.blocked(pid, (SEMAPHORE, event.value))
+            elif event.kind == SEMAPHORE_V_EVENT:
+                self.check_semaphore_inited(event.value)
+                self.log(SEMAPHORE_V_CALLED, self.current_process, event.value)
+                self.switch_process(self.kernel.syscall_semaphore_v(event.value))
+                self.released(owner, (SEMAPHORE, event.value))
+            elif event.kind == MUTEX_LOCK_EVENT:
+                self.check_mutex_inited(event.value)
+                self.log(MUTEX_LOCK_CALLED, self.current_process, event.value)
+                pid = self.current_process
+                self.switch_process(self.kernel.syscall_mutex_lock(event.value))
+                if pid in self.kernel.blocked_on:
+                    self.blocked(pid, (MUTEX, event.value))
+            elif event.kind == MUTEX_UNLOCK_EVENT:
+                self.check_mutex_inited(event.value)
+                self.log(MUTEX_UNLOCK_CALLED, self.current_process, event.value)
+                self.switch_process(self.kernel.syscall_mutex_unlock(event.value))
+                self.released(owner, (MUTEX, event.value))
+            elif event.kind == MEMORY_EVENT:
+                translation = self.mmu.translate(event.value, self.current_process)
+                if translation is None:
+                    self.log(SEGFAULT, self.current_process, event.value)
+                    self.log(TRAPPED, self.current_process)
+                    self.exit_current_process()
+                else:
+                    self.log(MEMORY_ACCESSED, self.current_process, event.value, translation)
 
     def exit_current_process(self):
+        self.sync_timer()
         new_process = self.kernel.syscall_exit()
         if new_process == self.current_process:
             raise SimulationError(f"Attempted to continue execution of exiting process (pid = {self.current_process})")
         
         del self.processes[self.current_process]
-        
+        self.last_cpu.pop(self.current_process, None)
+        # Releases a process exits without calling are never coming
+        lost = list(self.releases.pop(self.current_process))
+        for resource in lost:
+            self.remove_releaser(self.current_process, resource)
+
         self.switch_process(new_process)
+        for resource in lost:
+            self.check_waiters_for_deadlock(resource)
+
+    # owner's v() or unlock() on resource was dispatched, which may have woken a process blocked on it.
+    # The rest of a process's events due in the same tick are dispatched even after it blocked or exited on one of them.
+    def released(self, owner: PID, resource: tuple[str, int]):
+        woken = self.kernel.woken
+        if woken != 0:
+            for woken_release in self.releases[woken]:
+                self.count_free_releaser(woken_release, 1)
+            if resource in self.releases[woken]:
+                self.releasers.setdefault(resource, set()).add(woken)
+
+        releases = self.releases.get(owner)
+        if releases is None:
+            return
+        if releases[resource] > 1:
+            releases[resource] -= 1
+            return
+        del releases[resource]
+        blocked_on = self.kernel.blocked_on.get(owner)
+        if blocked_on is None:
+            self.remove_releaser(owner, resource)
+        elif (blocked_on.kind, blocked_on.id) != resource:
+            self.discard_releaser(owner, resource)
+        self.check_waiters_for_deadlock(resource)
+
+    # pid blocked on resource. That can be the idle process when the events of a process that already blocked block again.
+    def blocked(self, pid: PID, resource: tuple[str, int]):
+        for blocked_release in self.releases.get(pid, ()):
+            self.count_free_releaser(blocked_release, -1)
+        if resource in self.releases.get(pid, ()):
+            self.discard_releaser(pid, resource)
+        self.check_for_deadlock(pid)
+
+    # Forgets a process that is not blocked as a releaser of resource.
+    def remove_releaser(self, pid: PID, resource: tuple[str, int]):
+        self.discard_releaser(pid, resource)
+        self.count_free_releaser(resource, -1)
+
+    def discard_releaser(self, pid: PID, resource: tuple[str, int]):
+        releasers = self.releasers[resource]
+        releasers.discard(pid)
+        if len(releasers) == 0:
+            del self.releasers[resource]
+
+    def count_free_releaser(self, resource: tuple[str, int], change: int):
+        count = self.free_releasers.get(resource, 0) + change
+        if count == 0:
+            del self.free_releasers[resource]
+        else:
+            self.free_releasers[resource] = count
+
+    # Fails right away once some blocked process can never be woken, instead of idling until the one second limit.
+    # The kernel cannot know whether some process will still call v() or unlock() on what a process waits for, which is how
+    # semaphores are used for signalling, but the simulator can, and hands it the releases it keeps count of.
+    # A process can only become stuck when it blocks, or when the last process that is not blocked and could wake it gives up on
+    # what it waits on. Nothing is reported while processes are still to arrive.
+    def check_for_deadlock(self, pid: PID):
+        if not self.arrivals.has_next() and self.kernel.is_stuck(pid, self.releasers, self.free_releasers):
+            self.report_deadlock(self.kernel.find_stuck(self.releases, self.free_releasers))
+
+    # The processes blocked on resource all wait on the same thing, so they are stuck together or not at all.
+    def check_waiters_for_deadlock(self, resource: tuple[str, int]):
+        if resource not in self.free_releasers and resource in self.kernel.waiters:
+            self.check_for_deadlock(next(iter(self.kernel.waiters[resource])))
+
+    def report_deadlock(self, stuck: list[PID]):
+        waits = []
+        for pid in stuck:
+            semaphore = self.kernel.blocked_on[pid]
+            wait = f"process {pid} waits for {semaphore.kind} {semaphore.id}"
+            if len(semaphore.holders) > 0:
+                holders = sorted(semaphore.holders)
+                wait += f" held by process{'es' if len(holders) > 1 else ''} {', '.join(str(holder) for holder in holders)}"
+            waits.append(wait)
+        raise SimulationError(f"Deadlock at {self.elapsed_time} microseconds: {'; '.join(waits)}")
 
     def check_semaphore_inited(self, id: int):
         if not self.semaphores[id].initilized:
-            self.log(f"Semaphore {id} initilized with value {self.semaphores[id].init_val}")
+            self.log(SEMAPHORE_INITIALIZED, id, self.semaphores[id].init_val)
             self.kernel.syscall_init_semaphore(id, self.semaphores[id].init_val)
             self.semaphores[id].initilized = True
 
     def check_mutex_inited(self, id: int):
         if not self.mutexes[id].initilized:
-            self.log(f"Mutex {id} initilized")
+            self.log(MUTEX_INITIALIZED, id)
             self.kernel.syscall_init_mutex(id)
             self.mutexes[id].initilized = True
 
     def check_for_arrival(self):
-        while len(self.arrivals) > 0 and self.arrivals[len(self.arrivals) - 1].arrival == self.elapsed_time:
+        while self.arrivals.has_next() and self.arrivals.next_arrival_time() == self.elapsed_time:
             new_process = self.arrivals.pop()
+            self.sync_timer()
             self.processes[self.next_pid] = new_process
-            self.log(f"{new_process.process_type} process {self.next_pid} arrived with priority {new_process.priority} requesting {new_process.memory_needed / MB_TO_BYTES}MB of memory")
+            self.log(PROCESS_ARRIVED, new_process.process_type, self.next_pid, new_process.priority, new_process.memory_needed)
             kernel_response = self.kernel.new_process_arrived(self.next_pid, new_process.priority, new_process.process_type, new_process.memory_needed)
             if kernel_response == -1:
-                self.log(f"Unable to allocate memory for new process. Dropping process.")
+                self.log(PROCESS_DROPPED)
                 del self.processes[self.next_pid]
             else:
+                self.releases[self.next_pid] = count_releases(new_process)
+                for resource in self.releases[self.next_pid]:
+                    self.releasers.setdefault(resource, set()).add(self.next_pid)
+                    self.count_free_releaser(resource, 1)
                 self.switch_process(kernel_response)
             self.next_pid += 1
+            # Nothing was reported while processes were still to arrive, so every blocked process is looked at once
+            if not self.arrivals.has_next():
+                stuck = self.kernel.find_stuck(self.releases, self.free_releasers)
+                if len(stuck) > 0:
+                    self.report_deadlock(stuck)
 
 
     def switch_process(self, new_process: int):
@@ -361,22 +687,95 @@ class Simulator:
             self.process_0_runtime = 0
 
         if new_process != self.current_process:
-            self.log(f"Context switching to pid: {new_process}")
+            self.log(CONTEXT_SWITCH, new_process)
+            self.mmu.switch_address_space(new_process)
         self.current_process = new_process
-
-    def log(self, str: str, student_log = False):
-        if student_log:
-            delimiter = '#'
-        else:
-            delimiter = ':'
-        self.simlog.write(f"{self.elapsed_time / 1000:.3f}ms {delimiter} {str}\n")
+        if self.num_cpus > 1:
+            self.switch_other_cpus()
+
+    # SMP mode: a kernel call on one cpu can also change what other cpus run, by handing them a new or woken process.
+    # Those switches are picked up here, after every kernel call, and logged as happening on their own cpu.
+    def switch_other_cpus(self):
+        selected = self.current_cpu
+        self.cpu_processes[selected] = self.current_process
+        self.count_migration(selected, self.current_process)
+        for cpu in range(self.num_cpus):
+            new_process = self.kernel.running_pid(cpu)
+            if cpu == selected or new_process == self.cpu_processes[cpu]:
+                continue
+            if new_process != 0:
+                if new_process not in self.processes:
+                    raise SimulationError(f"Attempted to switch to unkown PID {new_process}")
+                self.process_0_runtime = 0
+            self.current_cpu = cpu
+            self.log(CONTEXT_SWITCH, new_process)
+            self.mmu.switch_address_space(new_process)
+            self.cpu_processes[cpu] = new_process
+            self.switched_cpus.add(cpu)
+            self.count_migration(cpu, new_process)
+        self.current_cpu = selected
+
+        running = [pid for pid in self.cpu_processes if pid != 0]
+        if len(set(running)) != len(running):
+            raise SimulationError(f"Attempted to run the same process on more than one cpu (running pids = {self.cpu_processes})")
+
+    # A migration is a process running on a different cpu than the one it last ran on.
+    def count_migration(self, cpu: int, pid: PID):
+        if pid == 0:
+            return
+        last_cpu = self.last_cpu.get(pid)
+        if last_cpu is not None and last_cpu != cpu:
+            self.migrations += 1
+        self.last_cpu[pid] = cpu
+
+    # Hands an event that is part of the log to its subscribers. The text log only formats it when it is flushed.
+    def log(self, kind: int, *args):
+        time = self.elapsed_time
+        for subscriber in self.subscribers[kind]:
+            subscriber(time, kind, args)
         self.needs_spacing = True
     
     def log_add_spacing(self):
         if self.needs_spacing:
-            self.simlog.write("\n")
+            for subscriber in self.subscribers[SPACING]:
+                subscriber(self.elapsed_time, SPACING, ())
             self.needs_spacing = False
 
+    # Timer interrupts are not logged, so they do not start a new block of log lines.
+    def notify_timer(self, num_ticks: int):
+        for subscriber in self.subscribers[TIMER_INTERRUPT]:
+            subscriber(self.elapsed_time, TIMER_INTERRUPT, (num_ticks,))
+
+    # Statistics gathered by the kernel over the run, written as JSON.
+    def run_stats(self) -> dict:
+        stats = {
+            "contention": self.kernel.contention_stats(),
+            "tlb": self.mmu.tlb.stats(),
+        }
+        if self.mmu.pager is not None:
+            stats["paging"] = self.mmu.pager.stats()
+        if self.num_cpus > 1:
+            stats["smp"] = self.smp_stats()
+        return stats
+
+    # Per-cpu utilization and how often processes moved between cpus.
+    def smp_stats(self) -> dict:
+        cpus = []
+        for busy_time in self.cpu_busy_time:
+            cpus.append({
+                "busy_us": busy_time,
+                "utilization": busy_time / self.elapsed_time if self.elapsed_time > 0 else 0.0,
+            })
+        return {
+            "cpus": cpus,
+            "migrations": self.migrations,
+            "steals": self.kernel.steals,
+        }
+
+    def write_stats(self, stats_path: Path):
+        with open(stats_path, 'w') as file:
+            json.dump(self.run_stats(), file, indent=4)
+
 class StudentLogger:
     __simluator: Simulator
 
@@ -385,60 +784,535 @@ class StudentLogger:
 
     def log(self, str: str):
         if self.__simluator is not None:
-            self.__simluator.log(str, student_log=True)
-
-# Having events at the same time as other events in the same process could cause a desync between what the simulator thinks is running and what the handler does.
-# This assert ensures the process does not have this issue.
-# Additionally ensures that all events will happen before the process exits.
-def assert_events_are_valid_and_not_at_same_time(process: Process):
-    event_arrivals = set()
-    for event in process.priority_change_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
-    
-    for event in process.semaphore_p_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
-    
-    for event in process.semaphore_v_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
+            self.__simluator.log(STUDENT_LOG, str)
+
+# Loads a simulator saved by Simulator.checkpoint. Running it writes exactly what the saved simulation would have written from that point on.
+# The log carries on in the file the saved simulation was writing, which is cut back to where it was when the checkpoint was saved,
+# or in logfile_path, which starts as a copy of that part of the old log.
+# The workload file is read again if its processes were being streamed, and must not have changed.
+def resume_simulator(checkpoint_path: Path, logfile_path: str | None = None) -> Simulator:
+    with gzip.open(checkpoint_path, 'rb') as file:
+        simulator = pickle.load(file)
+    if simulator.simlog is not None:
+        simulator.simlog.reopen(logfile_path)
+    return simulator
+
+# Reads and validates a simulation description, see WorkloadValidator.
+# A precompiled workload (see compile_workload) was validated when it was compiled and is memory-mapped and used as is.
+def load_workload(emulation_description_path: Path, stream_processes: bool = False) -> Workload:
+    if is_compiled_workload(emulation_description_path):
+        compiled = CompiledWorkload(emulation_description_path)
+        return Workload(compiled.scheduling_algorithm, compiled.memory_size, \
+                        {id: Semaphore(init_val, False) for (id, init_val) in compiled.semaphores()}, \
+                        {id: Mutex(False) for id in compiled.mutexes()}, \
+                        CompiledArrivals(compiled, process_from_compiled))
+
+    validator = WorkloadValidator()
+    if stream_processes:
+        # Only the top level settings are kept, processes are checked as they are walked and read again when the simulation reaches them
+        emulation_json, arrival_times = read_workload_metadata(emulation_description_path, PROCESSES, ARRIVAL, validator.check_process)
+        validator.check_settings(emulation_json)
+        if PROCESSES in emulation_json:
+            validator.check_list(emulation_json[PROCESSES], PROCESSES)
+        elif arrival_times is None:
+            validator.error(PROCESSES, "missing")
+    else:
+        with open(emulation_description_path, 'r') as file:
+            emulation_json = json.load(file)
+        validator.check_workload(emulation_json)
+    validator.finish()
+
+    semaphores = {semaphore[SEMAPHORE_ID]: Semaphore(semaphore[SEMAPHORE_INIT_VAL], False) for semaphore in emulation_json.get(SEMAPHORES, [])}
+    mutexes = {mutex_id: Mutex(False) for mutex_id in emulation_json.get(MUTEXES, [])}
+
+    if stream_processes:
+        arrivals = StreamingArrivals(emulation_description_path, PROCESSES, build_process, arrival_times)
+    else:
+        arrivals = EagerArrivals([build_process(process) for process in emulation_json[PROCESSES]])
+
+    # Default memory size
+    memory_size_mb = emulation_json.get(MEMORY_SIZE, 1000)
+    return Workload(emulation_json["scheduling_algorithm"], memory_size_mb * MB_TO_BYTES, semaphores, mutexes, arrivals)
+
+# bool is its own type, so true and false are not integers.
+def all_ints(values: Iterable) -> bool:
+    return all(type(value) is int for value in values)
+
+# Memory access addresses may be written in any base Python understands.
+def is_address(address_str: str) -> bool:
+    try:
+        int(address_str, base=0)
+    except ValueError:
+        return False
+    return True
+
+# Checks a whole simulation description and collects every problem with where it is, instead of stopping at the first one.
+# No two events of a process may happen at the same time, which is checked as each process's events are gathered. The events are
+# gathered into columns (time, the cpu time of the process it belongs to, and which process that is) that are checked a batch of
+# processes at a time with builtins that each go over a whole column: every event has to be an integer before its process has used up
+# its cpu time. Only the processes in a batch that fail are gone over again, one value at a time by report_process, to find out what is
+# wrong and where.
+# Semaphore and mutex ids used by processes are gathered across the whole workload and checked against the declared ones at the end,
+# so the declarations may come after the processes in the file.
+# The checks are plain code rather than asserts, so they also run under python -O.
+class WorkloadValidator:
+    errors: list[str]
+    semaphore_ids: set[int]
+    mutex_ids: set[int]
+    # The first process to use each id and where in it
+    used_semaphores: dict[int, tuple[int, str]]
+    used_mutexes: dict[int, tuple[int, str]]
+    # The batch of processes not checked yet, by position, and the processes in it already known to be wrong
+    batch: dict[int, dict]
+    suspects: set[int]
+    # One row per event of the batch
+    times: list[int]
+    limits: list[int]
+    owners: list[int]
+    # One row per new priority, memory access address, and semaphore or mutex id of the batch
+    priorities: list[int]
+    addresses: list[str]
+    semaphore_uses: list[int]
+    semaphore_owners: list[int]
+    mutex_uses: list[int]
+    mutex_owners: list[int]
+
+    def __init__(self):
+        self.errors = []
+        self.semaphore_ids = set()
+        self.mutex_ids = set()
+        self.used_semaphores = dict()
+        self.used_mutexes = dict()
+        self.new_batch()
+
+    def new_batch(self):
+        self.batch = dict()
+        self.suspects = set()
+        self.times = []
+        self.limits = []
+        self.owners = []
+        self.priorities = []
+        self.addresses = []
+        self.semaphore_uses = []
+        self.semaphore_owners = []
+        self.mutex_uses = []
+        self.mutex_owners = []
+
+    def error(self, location: str, message: str):
+        self.errors.append(f"{location}: {message}")
+
+    def check_int(self, value, location: str) -> bool:
+        if type(value) is not int:
+            self.error(location, f"expected an integer, got {value!r}")
+            return False
+        return True
+
+    def check_list(self, value, location: str) -> bool:
+        if type(value) is not list:
+            self.error(location, "expected a list")
+            return False
+        return True
+
+    def check_workload(self, emulation_json):
+        if type(emulation_json) is not dict:
+            self.error("workload", "expected an object")
+            return
+        self.check_settings(emulation_json)
+        if PROCESSES not in emulation_json:
+            self.error(PROCESSES, "missing")
+        elif self.check_list(emulation_json[PROCESSES], PROCESSES):
+            for (i, process_json) in enumerate(emulation_json[PROCESSES]):
+                self.check_process(i, process_json)
+
+    # Everything but the processes.
+    def check_settings(self, emulation_json: dict):
+        scheduling_algorithm = emulation_json.get("scheduling_algorithm")
+        if type(scheduling_algorithm) is not str or scheduling_algorithm not in VALID_SCHEDULING_ALGORITHMS:
+            self.error("scheduling_algorithm", f"expected one of {sorted(VALID_SCHEDULING_ALGORITHMS)}")
+        if MEMORY_SIZE in emulation_json:
+            self.check_int(emulation_json[MEMORY_SIZE], MEMORY_SIZE)
+
+        if SEMAPHORES in emulation_json and self.check_list(emulation_json[SEMAPHORES], SEMAPHORES):
+            for (i, semaphore) in enumerate(emulation_json[SEMAPHORES]):
+                location = f"{SEMAPHORES}[{i}]"
+                if type(semaphore) is not dict:
+                    self.error(location, "expected an object")
+                    continue
+                self.check_int(semaphore.get(SEMAPHORE_INIT_VAL), f"{location}.{SEMAPHORE_INIT_VAL}")
+                if self.check_int(semaphore.get(SEMAPHORE_ID), f"{location}.{SEMAPHORE_ID}"):
+                    if semaphore[SEMAPHORE_ID] in self.semaphore_ids:
+                        self.error(f"{location}.{SEMAPHORE_ID}", f"semaphore {semaphore[SEMAPHORE_ID]} is declared more than once")
+                    self.semaphore_ids.add(semaphore[SEMAPHORE_ID])
+
+        if MUTEXES in emulation_json and self.check_list(emulation_json[MUTEXES], MUTEXES):
+            for (i, mutex_id) in enumerate(emulation_json[MUTEXES]):
+                if self.check_int(mutex_id, f"{MUTEXES}[{i}]"):
+                    self.mutex_ids.add(mutex_id)
+
+    # Adds a process's events to the columns of the batch. A process whose events cannot even be gathered is left for report_process,
+    # whatever of it already made it into the columns is harmless as report_process goes over all of it again.
+    def check_process(self, i: int, process_json):
+        if len(self.batch) == VALIDATION_BATCH_SIZE:
+            self.check_batch()
+        self.batch[i] = process_json
+        try:
+            get = process_json.get
+            total_cpu_time = get(TOTAL_CPU_TIME)
+            if type(get(ARRIVAL)) is not int or type(total_cpu_time) is not int or type(get(PRIORITY, 0)) is not int \
+                    or get(PROCESS_TYPE, FOREGROUND) not in VALID_PROCESS_TYPES or type(get(PROCESS_MEMORY_NEEDED, 0)) is not int:
+                self.suspects.add(i)
+                return
+            changes = get(PRIORITY_CHANGES, [])
+            semaphore_events = get(PROCESS_SEMAPHORE, [])
+            mutex_events = get(PROCESS_MUTEX, [])
+            accesses = get(PROCESS_MEMORY_ACCESS, [])
+            if type(changes) is not list or type(semaphore_events) is not list or type(mutex_events) is not list or type(accesses) is not list:
+                self.suspects.add(i)
+                return
+
+            # Most processes use only some kinds of events, so the columns of the other kinds are not even started
+            times = []
+            if changes:
+                times += [change[EVENT_ARRIVAL] for change in changes]
+                self.priorities += [change[NEW_PRIORITY] for change in changes]
+            if semaphore_events:
+                # A p and a v in the same entry is a p, the same as when the event is built
+                times += [event[PROCESS_SEMA_P] if PROCESS_SEMA_P in event else event[PROCESS_SEMA_V] for event in semaphore_events]
+                semaphore_uses = [event[PROCESSES_SEMA_ID] for event in semaphore_events]
+                self.semaphore_uses += semaphore_uses
+                self.semaphore_owners += [i] * len(semaphore_uses)
+            if mutex_events:
+                times += [event[PROCESS_MUTEX_LOCK] if PROCESS_MUTEX_LOCK in event else event[PROCESS_MUTEX_UNLOCK] for event in mutex_events]
+                mutex_uses = [event[PROCESSES_MUTEX_ID] for event in mutex_events]
+                self.mutex_uses += mutex_uses
+                self.mutex_owners += [i] * len(mutex_uses)
+            for access_list in accesses:
+                times += access_list.values()
+                self.addresses += access_list
+            if len(times) > 1 and len(set(times)) != len(times):
+                self.suspects.add(i)
+                return
+        except (KeyError, TypeError, AttributeError):
+            self.suspects.add(i)
+            return
 
-    for event in process.mutex_lock_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
-    
-    for event in process.mutex_unlock_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
-    
-    for event in process.memory_events:
-        assert(event.arrival not in event_arrivals)
-        event_arrivals.add(event.arrival)
+        if times:
+            self.times += times
+            self.limits += [total_cpu_time] * len(times)
+            self.owners += [i] * len(times)
+
+    def check_batch(self):
+        times = self.times
+        owners = self.owners
+        suspects = self.suspects
+        # Each check goes over its whole column first, and only if it fails over it again for the processes it failed on
+        if all_ints(times):
+            if any(map(operator.ge, times, self.limits)):
+                suspects.update(owner for (time, limit, owner) in zip(times, self.limits, owners) if time >= limit)
+        else:
+            suspects.update(owner for (time, limit, owner) in zip(times, self.limits, owners) if type(time) is not int or time >= limit)
+        # report_process finds nothing wrong with a process that is not, so a column without owners that fails is gone over with the
+        # whole batch
+        if not all_ints(self.priorities) or not all(map(is_address, self.addresses)):
+            suspects.update(self.batch)
+        for (uses, uses_owners) in [(self.semaphore_uses, self.semaphore_owners), (self.mutex_uses, self.mutex_owners)]:
+            if not all_ints(uses):
+                suspects.update(owner for (id, owner) in zip(uses, uses_owners) if type(id) is not int)
+
+        for i in sorted(suspects):
+            self.report_process(i, self.batch[i])
+        # The ids used by the other processes, the ones gone over again recorded theirs as they went.
+        # A process's uses are next to each other and in order, so j counts through its events.
+        for (uses, uses_owners, key, used) in [(self.semaphore_uses, self.semaphore_owners, PROCESS_SEMAPHORE, self.used_semaphores), \
+                                               (self.mutex_uses, self.mutex_owners, PROCESS_MUTEX, self.used_mutexes)]:
+            first_use = dict()
+            last_owner = None
+            for (id, owner) in zip(uses, uses_owners):
+                j = j + 1 if owner == last_owner else 0
+                last_owner = owner
+                if owner not in suspects and id not in first_use:
+                    first_use[id] = (owner, j)
+            for (id, (owner, j)) in first_use.items():
+                if id not in used or used[id][0] > owner:
+                    used[id] = (owner, f"{PROCESSES}[{owner}].{key}[{j}]")
+        self.new_batch()
+
+    # Reports everything wrong with a process that check_batch found a problem in.
+    def report_process(self, i: int, process_json: dict):
+        location = f"{PROCESSES}[{i}]"
+        if type(process_json) is not dict:
+            self.error(location, "expected an object")
+            return
+        self.check_int(process_json.get(ARRIVAL), f"{location}.{ARRIVAL}")
+        total_cpu_time = process_json.get(TOTAL_CPU_TIME)
+        self.check_int(total_cpu_time, f"{location}.{TOTAL_CPU_TIME}")
+        if PRIORITY in process_json:
+            self.check_int(process_json[PRIORITY], f"{location}.{PRIORITY}")
+        if PROCESS_TYPE in process_json and (type(process_json[PROCESS_TYPE]) is not str or process_json[PROCESS_TYPE] not in VALID_PROCESS_TYPES):
+            self.error(f"{location}.{PROCESS_TYPE}", f"expected one of {sorted(VALID_PROCESS_TYPES)}")
+        if PROCESS_MEMORY_NEEDED in process_json:
+            self.check_int(process_json[PROCESS_MEMORY_NEEDED], f"{location}.{PROCESS_MEMORY_NEEDED}")
+
+        # Columns of every event's time and where it is
+        times = []
+        locations = []
+
+        if PRIORITY_CHANGES in process_json and self.check_list(process_json[PRIORITY_CHANGES], f"{location}.{PRIORITY_CHANGES}"):
+            for (j, change) in enumerate(process_json[PRIORITY_CHANGES]):
+                event_location = f"{location}.{PRIORITY_CHANGES}[{j}]"
+                if type(change) is not dict:
+                    self.error(event_location, "expected an object")
+                    continue
+                self.check_int(change.get(NEW_PRIORITY), f"{event_location}.{NEW_PRIORITY}")
+                if self.check_int(change.get(EVENT_ARRIVAL), f"{event_location}.{EVENT_ARRIVAL}"):
+                    times.append(change[EVENT_ARRIVAL])
+                    locations.append(event_location)
+
+        for (key, id_key, calls, used) in [(PROCESS_SEMAPHORE, PROCESSES_SEMA_ID, (PROCESS_SEMA_P, PROCESS_SEMA_V), self.used_semaphores), \
+                                           (PROCESS_MUTEX, PROCESSES_MUTEX_ID, (PROCESS_MUTEX_LOCK, PROCESS_MUTEX_UNLOCK), self.used_mutexes)]:
+            if key not in process_json or not self.check_list(process_json[key], f"{location}.{key}"):
+                continue
+            for (j, event) in enumerate(process_json[key]):
+                event_location = f"{location}.{key}[{j}]"
+                if type(event) is not dict:
+                    self.error(event_location, "expected an object")
+                    continue
+                if self.check_int(event.get(id_key), f"{event_location}.{id_key}"):
+                    if event[id_key] not in used or used[event[id_key]][0] > i:
+                        used[event[id_key]] = (i, event_location)
+                call = next((call for call in calls if call in event), None)
+                if call is None:
+                    self.error(event_location, f"expected {calls[0]} or {calls[1]}")
+                elif self.check_int(event[call], f"{event_location}.{call}"):
+                    times.append(event[call])
+                    locations.append(event_location)
+
+        if PROCESS_MEMORY_ACCESS in process_json and self.check_list(process_json[PROCESS_MEMORY_ACCESS], f"{location}.{PROCESS_MEMORY_ACCESS}"):
+            for (j, access_list) in enumerate(process_json[PROCESS_MEMORY_ACCESS]):
+                event_location = f"{location}.{PROCESS_MEMORY_ACCESS}[{j}]"
+                if type(access_list) is not dict:
+                    self.error(event_location, "expected an object")
+                    continue
+                for (address_str, arrival) in access_list.items():
+                    if not is_address(address_str):
+                        self.error(event_location, f"{address_str!r} is not an address")
+                    if self.check_int(arrival, f"{event_location}.{address_str}"):
+                        times.append(arrival)
+                        locations.append(f"{event_location}.{address_str}")
+
+        first_at = dict()
+        for (time, event_location) in zip(times, locations):
+            if type(total_cpu_time) is int and time >= total_cpu_time:
+                self.error(event_location, f"event at {time} is not before the process's total_cpu_time of {total_cpu_time}")
+            if time in first_at:
+                self.error(event_location, f"event at {time} is at the same time as {first_at[time]}")
+            else:
+                first_at[time] = event_location
+
+    # Raises WorkloadError with every problem found, if there were any.
+    def finish(self):
+        self.check_batch()
+        for (kind, used, declared) in [("semaphore", self.used_semaphores, self.semaphore_ids), ("mutex", self.used_mutexes, self.mutex_ids)]:
+            for (id, (_, location)) in sorted(used.items(), key=lambda item: item[1]):
+                if id not in declared:
+                    self.error(location, f"{kind} {id} is not declared")
+        if len(self.errors) > 0:
+            raise WorkloadError(self.errors)
+
+# The fields each kind of event's time and value come from, to name them in errors.
+EVENT_FIELDS: dict[int, tuple[str, str]] = {
+    PRIORITY_CHANGE_EVENT: (f"{PRIORITY_CHANGES}.{EVENT_ARRIVAL}", f"{PRIORITY_CHANGES}.{NEW_PRIORITY}"),
+    SEMAPHORE_P_EVENT: (f"{PROCESS_SEMAPHORE}.{PROCESS_SEMA_P}", f"{PROCESS_SEMAPHORE}.{PROCESSES_SEMA_ID}"),
+    SEMAPHORE_V_EVENT: (f"{PROCESS_SEMAPHORE}.{PROCESS_SEMA_V}", f"{PROCESS_SEMAPHORE}.{PROCESSES_SEMA_ID}"),
+    MUTEX_LOCK_EVENT: (f"{PROCESS_MUTEX}.{PROCESS_MUTEX_LOCK}", f"{PROCESS_MUTEX}.{PROCESSES_MUTEX_ID}"),
+    MUTEX_UNLOCK_EVENT: (f"{PROCESS_MUTEX}.{PROCESS_MUTEX_UNLOCK}", f"{PROCESS_MUTEX}.{PROCESSES_MUTEX_ID}"),
+    MEMORY_EVENT: (f"{PROCESS_MEMORY_ACCESS} time", f"{PROCESS_MEMORY_ACCESS} address"),
+}
+
+# Every value of a workload that does not fit in the compiled format's int64 columns, by field and process id.
+# processes are in arrival order, so the i-th one gets pid i + 1 like when it is simulated.
+def compiled_range_errors(workload: Workload, processes: list[Process]) -> list[str]:
+    errors = []
+    def check(location: str, field: str, value: int, shown=None):
+        if not INT64_MIN <= value <= INT64_MAX:
+            errors.append(f"{location}: {field} {value if shown is None else shown} does not fit in a compiled workload")
+
+    check("workload", MEMORY_SIZE, workload.memory_size, workload.memory_size // MB_TO_BYTES)
+    for (id, semaphore) in workload.semaphores.items():
+        check(f"semaphore {id}", SEMAPHORE_ID, id)
+        check(f"semaphore {id}", SEMAPHORE_INIT_VAL, semaphore.init_val)
+    for id in workload.mutexes:
+        check(f"mutex {id}", PROCESSES_MUTEX_ID, id)
+    for (i, process) in enumerate(processes):
+        location = f"process {i + 1}"
+        check(location, ARRIVAL, process.arrival)
+        check(location, TOTAL_CPU_TIME, process.total_cpu_time)
+        check(location, PRIORITY, process.priority)
+        check(location, PROCESS_MEMORY_NEEDED, process.memory_needed, process.memory_needed // MB_TO_BYTES)
+        for event in process.events:
+            (time_field, value_field) = EVENT_FIELDS[event.kind]
+            check(location, time_field, event.arrival)
+            check(location, value_field, event.value)
+    return errors
+
+# Validates a simulation description once and writes it in the precompiled format.
+def compile_workload(emulation_description_path: Path, compiled_path: Path):
+    workload = load_workload(emulation_description_path)
+    # EagerArrivals keeps the first arrival at the end
+    processes = list(reversed(workload.arrivals.processes))
+    errors = compiled_range_errors(workload, processes)
+    if len(errors) > 0:
+        raise WorkloadError(errors)
+    write_compiled_workload(compiled_path, workload.scheduling_algorithm, workload.memory_size, \
+                            [(id, semaphore.init_val) for (id, semaphore) in workload.semaphores.items()], \
+                            list(workload.mutexes), \
+                            [(p.arrival, p.total_cpu_time, p.priority, p.process_type, p.memory_needed, \
+                              [(e.arrival, e.kind, e.value) for e in p.events]) for p in processes])
+
+# Builds the i-th process of a compiled workload. Its events are already validated and sorted.
+def process_from_compiled(compiled: "CompiledWorkload", i: int) -> Process:
+    (arrival, total_cpu_time, priority, process_type, memory_needed, events) = compiled.process(i)
+    return Process(arrival, total_cpu_time, 0, priority, [ProcessEvent(*event) for event in events], 0, process_type, memory_needed)
+
+# Turns one entry of the processes array, already checked by WorkloadValidator, into a Process with its events sorted.
+def build_process(process_json: dict) -> Process:
+    events = []
+    for change in process_json.get(PRIORITY_CHANGES, []):
+        events.append(ProcessEvent(change[EVENT_ARRIVAL], PRIORITY_CHANGE_EVENT, change[NEW_PRIORITY]))
+
+    for event in process_json.get(PROCESS_SEMAPHORE, []):
+        if PROCESS_SEMA_P in event:
+            events.append(ProcessEvent(event[PROCESS_SEMA_P], SEMAPHORE_P_EVENT, event[PROCESSES_SEMA_ID]))
+        else:
+            events.append(ProcessEvent(event[PROCESS_SEMA_V], SEMAPHORE_V_EVENT, event[PROCESSES_SEMA_ID]))
 
-    for event_arrival in event_arrivals:
-        assert(event_arrival < process.total_cpu_time)
+    for event in process_json.get(PROCESS_MUTEX, []):
+        if PROCESS_MUTEX_LOCK in event:
+            events.append(ProcessEvent(event[PROCESS_MUTEX_LOCK], MUTEX_LOCK_EVENT, event[PROCESSES_MUTEX_ID]))
+        else:
+            events.append(ProcessEvent(event[PROCESS_MUTEX_UNLOCK], MUTEX_UNLOCK_EVENT, event[PROCESSES_MUTEX_ID]))
+
+    for access_list in process_json.get(PROCESS_MEMORY_ACCESS, []):
+        for (address_str, arrival) in access_list.items():
+            events.append(ProcessEvent(arrival, MEMORY_EVENT, int(address_str, base=0)))
+
+    sort_process_events(events)
+
+    # Default priority, type and memory needed
+    return Process(process_json[ARRIVAL], process_json[TOTAL_CPU_TIME], 0, process_json.get(PRIORITY, DEFAULT_PRIORITY), events, 0, \
+                   process_json.get(PROCESS_TYPE, "Foreground"), process_json.get(PROCESS_MEMORY_NEEDED, 10) * MB_TO_BYTES)
+
+# How many v() and unlock() calls the process has yet to make on each (SEMAPHORE or MUTEX, id).
+def count_releases(process: Process) -> dict[tuple[str, int], int]:
+    releases = dict()
+    for event in process.events[process.next_event:]:
+        if event.kind in RELEASE_EVENTS:
+            resource = (RELEASE_EVENTS[event.kind], event.value)
+            releases[resource] = releases.get(resource, 0) + 1
+    return releases
+
+# Returns the cpu time at which the process will next do something observable, either its next pending event or finishing execution.
+def next_process_event_cpu_time(process: Process) -> MICRO_S:
+    if process.next_event < len(process.events):
+        return min(process.total_cpu_time, event_dispatch_time(process.events[process.next_event]))
+    return process.total_cpu_time
+
+# The elapsed cpu time at which an event is dispatched.
+# A running process has always run for at least 1 microsecond when its events are checked, so events at 0 are dispatched together with events at 1.
+def event_dispatch_time(event: ProcessEvent) -> MICRO_S:
+    return max(event.arrival, 1)
+
+# Sorts a process's events into the order they are dispatched in: by time, then by kind and original time for events that are due on the same tick.
+def sort_process_events(events: list[ProcessEvent]):
+    events.sort(key=lambda e: (event_dispatch_time(e), e.kind, e.arrival))
 
 def print_usage():
-    print("Usage: python simulator.py <simulation_description_path> <log_path> <optional --no-student-logs>")
+    print("Usage: python simulator.py <simulation_description_path> <log_path> <optional --no-student-logs> <optional --stats stats_path>")
+    print("       <optional --log-format text|binary> <optional --log-buffer num_records> <optional --log-flush full|tick>")
+    print("       <optional --profile-kernel profile_path> <optional --stream> <optional --tickless>")
+    print("       <optional --paging fifo|lru|clock> <optional --cpus num_cpus>")
+    print("       <optional --checkpoint checkpoint_path> <optional --checkpoint-interval microseconds>")
+    print("       python simulator.py compile <simulation_description_path> <compiled_path>")
+    print("       python simulator.py resume <checkpoint_path> <optional --log log_path> <optional --stats stats_path>")
     sys.exit(1)
 
 
 if __name__ == "__main__":
     student_logs = True
-    if len(sys.argv) <= 2 or len(sys.argv) >= 5:
+    stats_path = None
+    log_format = TEXT_LOG
+    log_buffer_size = DEFAULT_LOG_BUFFER_SIZE
+    log_flush_policy = FLUSH_WHEN_FULL
+    kernel_profile_path = None
+    stream_processes = False
+    tickless = False
+    page_replacement = None
+    num_cpus = 1
+    checkpoint_path = None
+    checkpoint_interval = None
+    if len(sys.argv) <= 2:
         print_usage()
+    if sys.argv[1] == "compile":
+        if len(sys.argv) != 4:
+            print_usage()
+        compile_workload(Path(sys.argv[2]), Path(sys.argv[3]))
+        sys.exit(0)
+    if sys.argv[1] == "resume":
+        log_path = None
+        options = sys.argv[3:]
+        while len(options) > 0:
+            option = options.pop(0)
+            if option == "--log" and len(options) > 0:
+                log_path = Path(options.pop(0))
+            elif option == "--stats" and len(options) > 0:
+                stats_path = Path(options.pop(0))
+            else:
+                print_usage()
+        simulator = resume_simulator(Path(sys.argv[2]), log_path)
+        simulator.run_simulator()
+        if stats_path is not None:
+            simulator.write_stats(stats_path)
+        sys.exit(0)
     if type(sys.argv[1]) is not str or type(sys.argv[2]) is not str:
         print_usage()
-    if len(sys.argv) == 4:
-        if sys.argv[3] != "--no-student-logs":
-            print_usage()
-        else:
+    options = sys.argv[3:]
+    while len(options) > 0:
+        option = options.pop(0)
+        if option == "--no-student-logs":
             student_logs = False
-
-
+        elif option == "--stats" and len(options) > 0:
+            stats_path = Path(options.pop(0))
+        elif option == "--log-format" and len(options) > 0 and options[0] in VALID_LOG_FORMATS:
+            log_format = options.pop(0)
+        elif option == "--log-buffer" and len(options) > 0 and options[0].isdigit() and int(options[0]) > 0:
+            log_buffer_size = int(options.pop(0))
+        elif option == "--log-flush" and len(options) > 0 and options[0] in VALID_FLUSH_POLICIES:
+            log_flush_policy = options.pop(0)
+        elif option == "--profile-kernel" and len(options) > 0:
+            kernel_profile_path = Path(options.pop(0))
+        elif option == "--stream":
+            stream_processes = True
+        elif option == "--tickless":
+            tickless = True
+        elif option == "--paging" and len(options) > 0 and options[0] in VALID_PAGE_REPLACEMENTS:
+            page_replacement = options.pop(0)
+        elif option == "--cpus" and len(options) > 0 and options[0].isdigit() and int(options[0]) > 0:
+            num_cpus = int(options.pop(0))
+        elif option == "--checkpoint" and len(options) > 0:
+            checkpoint_path = Path(options.pop(0))
+        elif option == "--checkpoint-interval" and len(options) > 0 and options[0].isdigit() and int(options[0]) > 0:
+            checkpoint_interval = int(options.pop(0))
+        else:
+            print_usage()
+    if tickless and num_cpus > 1:
+        print_usage()
+    if (checkpoint_path is None) != (checkpoint_interval is None):
+        print_usage()
 
     sim_description = Path(sys.argv[1])
     log_path = Path(sys.argv[2])
-    simulator = Simulator(sim_description, log_path, student_logs)
-    simulator.run_simulator()
\ No newline at end of file
+    simulator = Simulator(sim_description, log_path, student_logs, log_format, log_buffer_size, log_flush_policy, kernel_profile_path, stream_processes, tickless, page_replacement, \
+                          num_cpus=num_cpus, checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval)
+    simulator.run_simulator()
+    if stats_path is not None:
+        simulator.write_stats(stats_path)
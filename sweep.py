@@ -0,0 +1,133 @@
+import argparse
+import csv
+from dataclasses import dataclass
+import itertools
+import multiprocessing
+import os
+from pathlib import Path
+import time
+
+import kernel
+import simulator
+from metrics import MetricsCollector
+from simulator import Simulator, Workload, load_workload, VALID_SCHEDULING_ALGORITHMS
+
+# Algorithms that read each swept parameter. A parameter is only swept for the algorithms that use it.
+USES_RR_QUANTUM = {"RR", "Multilevel"}
+USES_ACTIVE_QUEUE_TICKS = {"Multilevel"}
+
+ROW_FIELDS = [
+    "algorithm", "rr_quantum_ticks", "active_queue_num_ticks", "timer_interrupt_interval",
+    "processes", "mean_turnaround_us", "p99_turnaround_us", "mean_waiting_us", "mean_response_us", "p99_response_us",
+    "cpu_utilization", "context_switches", "run_s", "error",
+]
+
+# One point of the grid. None means the algorithm does not use the parameter.
+@dataclass
+class SweepCell:
+    algorithm: str
+    rr_quantum_ticks: int | None
+    active_queue_num_ticks: int | None
+    timer_interrupt_interval: int
+    tickless: bool = False
+
+# The workload every cell runs. It is parsed once in the parent and each cell runs in a freshly forked worker,
+# so workers see it copy-on-write and the run's changes to it never reach another cell.
+shared_workload: Workload | None = None
+
+def build_grid(algorithms: list[str], rr_quanta: list[int], active_queue_ticks: list[int], timer_intervals: list[int], tickless: bool) -> list[SweepCell]:
+    cells = []
+    for algorithm in algorithms:
+        quanta = rr_quanta if algorithm in USES_RR_QUANTUM else [None]
+        active_ticks = active_queue_ticks if algorithm in USES_ACTIVE_QUEUE_TICKS else [None]
+        for (quantum, ticks, interval) in itertools.product(quanta, active_ticks, timer_intervals):
+            cells.append(SweepCell(algorithm, quantum, ticks, interval, tickless))
+    return cells
+
+def run_cell(cell: SweepCell) -> dict:
+    if cell.rr_quantum_ticks is not None:
+        kernel.RR_QUANTUM_TICKS = cell.rr_quantum_ticks
+    if cell.active_queue_num_ticks is not None:
+        kernel.ACTIVE_QUEUE_NUM_TICKS = cell.active_queue_num_ticks
+    simulator.TIMER_INTERRUPT_INTERVAL = cell.timer_interrupt_interval
+
+    row = {
+        "algorithm": cell.algorithm,
+        "rr_quantum_ticks": cell.rr_quantum_ticks,
+        "active_queue_num_ticks": cell.active_queue_num_ticks,
+        "timer_interrupt_interval": cell.timer_interrupt_interval,
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        sim = Simulator(None, None, False, tickless=cell.tickless, scheduling_algorithm=cell.algorithm, workload=shared_workload)
+        collector = MetricsCollector(sim)
+        sim.run_simulator()
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["run_s"] = time.perf_counter() - start
+    if row["error"] is not None:
+        return row
+
+    report = collector.summary().report()
+    row.update({
+        "processes": report["turnaround_us"]["count"],
+        "mean_turnaround_us": report["turnaround_us"]["mean"],
+        "p99_turnaround_us": report["turnaround_us"]["p99"],
+        "mean_waiting_us": report["waiting_us"]["mean"],
+        "mean_response_us": report["response_us"]["mean"],
+        "p99_response_us": report["response_us"]["p99"],
+        "cpu_utilization": report["cpu_utilization"],
+        "context_switches": report["context_switches"],
+    })
+    return row
+
+# Runs every cell of a workload that was parsed and validated once (see load_workload) in its own forked worker, in grid order.
+# Workers are forked rather than spawned so they inherit the parsed workload instead of parsing it again.
+def run_sweep(workload: Workload, cells: list[SweepCell], results_path: Path, num_workers: int | None = None) -> list[dict]:
+    global shared_workload
+    shared_workload = workload
+
+    rows = []
+    context = multiprocessing.get_context("fork")
+    with context.Pool(num_workers or os.cpu_count(), maxtasksperchild=1) as pool, open(results_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, ROW_FIELDS, restval="")
+        writer.writeheader()
+        print_header()
+        for row in pool.imap(run_cell, cells):
+            writer.writerow(row)
+            print_row(row)
+            rows.append(row)
+    shared_workload = None
+    return rows
+
+def print_header():
+    print(f"{'Algorithm':<11} {'Quantum':>7} {'Active':>6} {'Timer':>5} {'Turnaround':>11} {'p99':>9} {'Waiting':>9} {'Response':>9} {'CPU util':>8} {'Switches':>9} {'Run s':>7}")
+
+def print_row(row: dict):
+    def parameter(value: int | None) -> str:
+        return "-" if value is None else str(value)
+    prefix = f"{row['algorithm']:<11} {parameter(row['rr_quantum_ticks']):>7} {parameter(row['active_queue_num_ticks']):>6} {row['timer_interrupt_interval']:>5}"
+    if row["error"] is not None:
+        print(f"{prefix} {row['error']}", flush=True)
+        return
+    print(f"{prefix} {row['mean_turnaround_us']:>11.1f} {row['p99_turnaround_us']:>9.1f} {row['mean_waiting_us']:>9.1f} {row['mean_response_us']:>9.1f} "
+          f"{row['cpu_utilization']:>8.3f} {row['context_switches']:>9} {row['run_s']:>7.3f}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a workload over a grid of scheduler parameters and write one row of metrics per point.")
+    parser.add_argument("workload", type=Path)
+    parser.add_argument("results", type=Path, help="CSV file the results table is written to")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(VALID_SCHEDULING_ALGORITHMS), default=None,
+                        help="defaults to the workload's own algorithm")
+    parser.add_argument("--rr-quantum", nargs="+", type=int, default=[kernel.RR_QUANTUM_TICKS])
+    parser.add_argument("--active-queue-ticks", nargs="+", type=int, default=[kernel.ACTIVE_QUEUE_NUM_TICKS])
+    parser.add_argument("--timer-interval", nargs="+", type=int, default=[simulator.TIMER_INTERRUPT_INTERVAL])
+    parser.add_argument("--tickless", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    workload = load_workload(args.workload)
+    algorithms = args.algorithms if args.algorithms is not None else [workload.scheduling_algorithm]
+    cells = build_grid(algorithms, args.rr_quantum, args.active_queue_ticks, args.timer_interval, args.tickless)
+    run_sweep(workload, cells, args.results, args.workers)
@@ -0,0 +1,171 @@
+import argparse
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+from simulator import VALID_SCHEDULING_ALGORITHMS, NUM_MICRO_IN_SEC
+
+CPU_TIME_UNIFORM: str = "uniform"
+CPU_TIME_EXPONENTIAL: str = "exponential"
+VALID_CPU_TIME_DISTRIBUTIONS = {CPU_TIME_UNIFORM, CPU_TIME_EXPONENTIAL}
+
+# Gaps between arrivals are capped below the simulator's one second idle limit so generated workloads never trip it.
+MAX_ARRIVAL_GAP = NUM_MICRO_IN_SEC // 2
+
+# Everything that shapes a generated workload. The same config and seed always produce the same workload.
+@dataclass
+class WorkloadConfig:
+    num_processes: int = 100
+    scheduling_algorithm: str = "RR"
+    seed: int = 0
+    cpu_time_distribution: str = CPU_TIME_EXPONENTIAL
+    mean_cpu_time: int = 200
+    # Average fraction of the CPU the arriving processes ask for. Above 1 the ready queues keep growing.
+    load: float = 0.9
+    # Fraction of processes that enter a critical section on a mutex or semaphore.
+    contention: float = 0.2
+    num_mutexes: int = 4
+    num_semaphores: int = 2
+    semaphore_init_val: int = 2
+    # Expected number of priority changes / memory accesses per 100 microseconds of cpu time.
+    priority_change_rate: float = 0.5
+    memory_access_density: float = 1.0
+    # Fraction of memory accesses that fall outside the process's memory and segfault.
+    bad_address_rate: float = 0.01
+    max_memory_needed_mb: int = 10
+    memory_size_mb: int = 1000
+    max_priority: int = 40
+    background_fraction: float = 0.5
+
+def generate_workload(config: WorkloadConfig) -> dict:
+    assert(config.scheduling_algorithm in VALID_SCHEDULING_ALGORITHMS)
+    assert(config.cpu_time_distribution in VALID_CPU_TIME_DISTRIBUTIONS)
+    rng = random.Random(config.seed)
+
+    processes = []
+    arrival = 0
+    mean_gap = config.mean_cpu_time / config.load
+    for _ in range(config.num_processes):
+        processes.append(generate_process(config, rng, arrival))
+        arrival += min(MAX_ARRIVAL_GAP, int(rng.expovariate(1 / mean_gap)))
+
+    return {
+        "scheduling_algorithm": config.scheduling_algorithm,
+        "memory_size_MB": config.memory_size_mb,
+        "semaphores": [{"id": i, "init_val": config.semaphore_init_val} for i in range(config.num_semaphores)],
+        "mutexes": list(range(config.num_mutexes)),
+        "processes": processes,
+    }
+
+def generate_process(config: WorkloadConfig, rng: random.Random, arrival: int) -> dict:
+    if config.cpu_time_distribution == CPU_TIME_UNIFORM:
+        total_cpu_time = rng.randint(1, 2 * config.mean_cpu_time)
+    else:
+        total_cpu_time = max(1, int(rng.expovariate(1 / config.mean_cpu_time)))
+    memory_needed_mb = rng.randint(1, config.max_memory_needed_mb)
+
+    num_priority_changes = poisson(rng, total_cpu_time * config.priority_change_rate / 100)
+    num_memory_accesses = poisson(rng, total_cpu_time * config.memory_access_density / 100)
+    num_lock_events = 0
+    if rng.random() < config.contention and config.num_mutexes + config.num_semaphores > 0:
+        num_lock_events = 2
+
+    # Every event in a process needs its own time before the process finishes
+    num_events = min(total_cpu_time, num_priority_changes + num_memory_accesses + num_lock_events)
+    times = rng.sample(range(total_cpu_time), num_events)
+    if num_events < num_lock_events:
+        num_lock_events = 0
+
+    process = {
+        "arrival": arrival,
+        "total_cpu_time": total_cpu_time,
+        "priority": rng.randint(0, config.max_priority),
+        "type": "Background" if rng.random() < config.background_fraction else "Foreground",
+        "needed_memory_MB": memory_needed_mb,
+    }
+
+    # A single critical section per process, so generated workloads cannot deadlock
+    critical_section = None
+    if num_lock_events > 0:
+        start, end = sorted(times[:2])
+        critical_section = (start, end)
+        times = times[2:]
+        lock_id = rng.randrange(config.num_mutexes + config.num_semaphores)
+        if lock_id < config.num_mutexes:
+            process["mutex"] = [{"id": lock_id, "lock": start}, {"id": lock_id, "unlock": end}]
+        else:
+            semaphore_id = lock_id - config.num_mutexes
+            process["semaphore"] = [{"id": semaphore_id, "p": start}, {"id": semaphore_id, "v": end}]
+
+    num_priority_changes = min(num_priority_changes, len(times))
+    if num_priority_changes > 0:
+        process["priority_change"] = [{"arrival": time, "new_priority": rng.randint(0, config.max_priority)} for time in times[:num_priority_changes]]
+        times = times[num_priority_changes:]
+
+    if len(times) > 0:
+        memory_size = memory_needed_mb * 1048576
+        accesses = []
+        for time in times:
+            # Segfaulting while holding a lock would leave its waiters blocked forever.
+            # Events at time 0 are dispatched at time 1, so the times are compared as they are dispatched.
+            in_critical_section = critical_section is not None and max(critical_section[0], 1) <= max(time, 1) <= max(critical_section[1], 1)
+            if rng.random() < config.bad_address_rate and not in_critical_section:
+                address = 0x20000000 + memory_size + rng.randrange(memory_size)
+            else:
+                address = 0x20000000 + rng.randrange(memory_size)
+            accesses.append({hex(address): time})
+        process["memory_access"] = accesses
+
+    return process
+
+def poisson(rng: random.Random, mean: float) -> int:
+    # Counts exponential gaps that fit in the mean, fine for the small means used here
+    count = 0
+    remaining = mean
+    while True:
+        remaining -= rng.expovariate(1)
+        if remaining < 0:
+            return count
+        count += 1
+
+def write_workload(path: Path, config: WorkloadConfig):
+    with open(path, 'w') as file:
+        json.dump(generate_workload(config), file)
+
+def parse_args() -> tuple[Path, WorkloadConfig]:
+    defaults = WorkloadConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic simulation workload.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--processes", type=int, default=defaults.num_processes)
+    parser.add_argument("--algorithm", choices=sorted(VALID_SCHEDULING_ALGORITHMS), default=defaults.scheduling_algorithm)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--cpu-time-distribution", choices=sorted(VALID_CPU_TIME_DISTRIBUTIONS), default=defaults.cpu_time_distribution)
+    parser.add_argument("--mean-cpu-time", type=int, default=defaults.mean_cpu_time)
+    parser.add_argument("--load", type=float, default=defaults.load)
+    parser.add_argument("--contention", type=float, default=defaults.contention)
+    parser.add_argument("--mutexes", type=int, default=defaults.num_mutexes)
+    parser.add_argument("--semaphores", type=int, default=defaults.num_semaphores)
+    parser.add_argument("--priority-change-rate", type=float, default=defaults.priority_change_rate)
+    parser.add_argument("--memory-access-density", type=float, default=defaults.memory_access_density)
+    parser.add_argument("--memory-size", type=int, default=defaults.memory_size_mb)
+    args = parser.parse_args()
+    config = WorkloadConfig(
+        num_processes=args.processes,
+        scheduling_algorithm=args.algorithm,
+        seed=args.seed,
+        cpu_time_distribution=args.cpu_time_distribution,
+        mean_cpu_time=args.mean_cpu_time,
+        load=args.load,
+        contention=args.contention,
+        num_mutexes=args.mutexes,
+        num_semaphores=args.semaphores,
+        priority_change_rate=args.priority_change_rate,
+        memory_access_density=args.memory_access_density,
+        memory_size_mb=args.memory_size,
+    )
+    return (args.output, config)
+
+if __name__ == "__main__":
+    output_path, config = parse_args()
+    write_workload(output_path, config)
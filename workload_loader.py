@@ -0,0 +1,209 @@
+from array import array
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+DEFAULT_CHUNK_SIZE: int = 1 << 16
+
+# Reads one JSON document from a file a chunk at a time.
+# Values are decoded one at a time with the C json decoder, so arrays can be walked element by element
+# without ever holding the whole document in memory.
+class JSONStreamReader:
+    buffer: str
+    pos: int
+    eof: bool
+
+    def __init__(self, path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.file = open(path, 'rb')
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def close(self):
+        self.file.close()
+
+    # Drops what has been consumed and reads more of the file.
+    # Reads at least as much as is already buffered so a value spanning many chunks is still decoded in linear time.
+    def fill(self):
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(chunk, final=len(chunk) == 0)
+        self.pos = 0
+        self.eof = len(chunk) == 0
+
+    def peek(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self.fill()
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON stream")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            # A number cut off at the end of the buffer would decode as a shorter number
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    # Yields the keys of the object starting at the current position.
+    # After each key the caller must consume its value with read_value or iter_array.
+    def iter_object_keys(self) -> Iterator[str]:
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+
+# Reads every top level value of a workload except the array under array_key, which is walked and discarded
+# apart from the integer each element holds under index_key.
+# Each element is handed to check_element with its position first. Without it, elements that hold no integer under index_key
+# raise ValueError, with it they are left to check_element and indexed as 0.
+# A value under array_key that is not an array is returned with the other values for the caller to report.
+# Returns the values and the indexed integers, or None if there is no array under array_key. The integers are packed in an array
+# unless one does not fit in 64 bits, which JSON allows, and then they are kept in a list.
+def read_workload_metadata(path: Path, array_key: str, index_key: str, check_element: Callable[[int, Any], None] | None = None) \
+        -> tuple[dict[str, Any], array | list[int] | None]:
+    reader = JSONStreamReader(path)
+    metadata = dict()
+    index = None
+    try:
+        for key in reader.iter_object_keys():
+            if key == array_key and reader.peek() == "[":
+                index = array('q')
+                for (i, element) in enumerate(reader.iter_array()):
+                    if check_element is not None:
+                        check_element(i, element)
+                    if type(element) is dict and type(element.get(index_key)) is int:
+                        try:
+                            index.append(element[index_key])
+                        except OverflowError:
+                            index = list(index)
+                            index.append(element[index_key])
+                    elif check_element is None:
+                        raise ValueError(f"{array_key}[{i}] has no integer {index_key}")
+                    else:
+                        index.append(0)
+            else:
+                metadata[key] = reader.read_value()
+    finally:
+        reader.close()
+    return (metadata, index)
+
+# Yields the elements of the top level array under array_key one at a time.
+def iter_workload_array(path: Path, array_key: str) -> Iterator[Any]:
+    reader = JSONStreamReader(path)
+    try:
+        for key in reader.iter_object_keys():
+            if key == array_key:
+                yield from reader.iter_array()
+                return
+            reader.read_value()
+    finally:
+        reader.close()
+
+# Processes waiting to arrive, all parsed up front.
+# Processes that arrive at the same time arrive in reverse file order.
+class EagerArrivals:
+    def __init__(self, processes: list):
+        # Sort arrivals so earliest arrivals are at the end.
+        self.processes = sorted(processes, key=lambda p: p.arrival, reverse=True)
+
+    def has_next(self) -> bool:
+        return len(self.processes) > 0
+
+    def next_arrival_time(self) -> int | None:
+        if len(self.processes) == 0:
+            return None
+        return self.processes[len(self.processes) - 1].arrival
+
+    def pop(self):
+        return self.processes.pop()
+
+# Processes waiting to arrive, read from the workload file as the simulation reaches them.
+# The arrival time of every process is known up front (see read_workload_metadata), which fixes the order they arrive in.
+# The file is read in order and each process is only turned into a Process when it arrives.
+# Processes that are read before their turn, because the file is not sorted by arrival, wait as raw JSON,
+# so for a sorted file only the processes arriving next are held in memory.
+# Processes that arrive at the same time arrive in reverse file order, the same as EagerArrivals.
+# When pickled the open file is left out and, once unpickled, the file is read again up to where it had got to.
+class StreamingArrivals:
+    def __init__(self, path: Path, array_key: str, parse_process: Callable[[Any], Any], arrival_times: array | list[int]):
+        self.path = path
+        self.array_key = array_key
+        self.raw_processes = iter_workload_array(path, array_key)
+        self.parse_process = parse_process
+        self.arrival_times = arrival_times
+        self.order = array('q', sorted(range(len(arrival_times)), key=lambda i: (arrival_times[i], -i)))
+        self.next_in_order = 0
+        self.num_read = 0
+        self.read_early = dict()
+
+    def has_next(self) -> bool:
+        return self.next_in_order < len(self.order)
+
+    def next_arrival_time(self) -> int | None:
+        if not self.has_next():
+            return None
+        return self.arrival_times[self.order[self.next_in_order]]
+
+    def pop(self):
+        file_index = self.order[self.next_in_order]
+        self.next_in_order += 1
+        while file_index not in self.read_early:
+            self.read_early[self.num_read] = next(self.raw_processes)
+            self.num_read += 1
+        return self.parse_process(self.read_early.pop(file_index))
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["raw_processes"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.raw_processes = iter_workload_array(self.path, self.array_key)
+        for _ in range(self.num_read):
+            next(self.raw_processes)